@@ -0,0 +1,184 @@
+"""
+Fake of the googleapiclient YouTube resource with configurable latency and error rate, and a fake
+resolver in place of the browser.
+"""
+import hashlib
+import itertools
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from src.spotify.models import Track
+from src.youtube.exception import VideoNotFoundException
+from src.youtube.resolver import Resolver
+
+
+def video_id_for(text: str) -> str:
+    return hashlib.sha1(text.encode(), usedforsecurity=False).hexdigest()[:11]
+
+
+class FakeRequest:
+    def __init__(self, client: "FakeYouTubeClient", handler: Callable[[], Any]):
+        self.client = client
+        self.handler = handler
+
+    def execute(self) -> Any:
+        self.client.wait()
+        return self.handler()
+
+
+class FakeResource:
+    def __init__(self, client: "FakeYouTubeClient", methods: Dict[str, Callable]):
+        self.client = client
+        self.methods = methods
+
+    def __getattr__(self, name: str):
+        method = self.methods[name]
+        return lambda **kwargs: FakeRequest(self.client, lambda: method(**kwargs))
+
+
+class FakeBatch:
+    def __init__(self, client: "FakeYouTubeClient", callback: Callable):
+        self.client = client
+        self.callback = callback
+        self.requests: List = []
+
+    def add(self, request: FakeRequest, request_id: str) -> None:
+        self.requests.append((request, request_id))
+
+    def execute(self) -> None:
+        # one round trip for the whole batch
+        self.client.wait()
+        for request, request_id in self.requests:
+            try:
+                response, error = request.handler(), None
+            except HttpError as e:
+                response, error = None, e
+            self.callback(request_id, response, error)
+
+
+class FakeYouTubeClient:
+    """
+    Answers the calls SpotTube makes: playlists.insert, playlistItems.insert/list, videos.list and
+    search.list, plus batch requests. Every call waits `latency` seconds and fails with a 503 at
+    `error_rate`.
+    """
+
+    def __init__(
+        self, latency: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = 0
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.playlists_items: Dict[str, List[str]] = {}
+        self.calls: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            failed = self.random.random() < self.error_rate
+        if failed:
+            raise HttpError(httplib2.Response({"status": 503}), b"backendError")
+
+    def _insert_playlist(self, part: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        self._call("playlists.insert")
+        playlist_id = f"PL{next(self._ids)}"
+        with self._lock:
+            self.playlists_items[playlist_id] = []
+        return {"id": playlist_id, "snippet": body["snippet"]}
+
+    def _insert_item(self, part: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        self._call("playlistItems.insert")
+        snippet = body["snippet"]
+        with self._lock:
+            items = self.playlists_items.setdefault(snippet["playlistId"], [])
+            items.insert(
+                snippet.get("position", len(items)), snippet["resourceId"]["videoId"]
+            )
+        return {"id": f"item{next(self._ids)}"}
+
+    def _list_items(self, playlistId: str, maxResults: int = 50, pageToken=None, **_):
+        self._call("playlistItems.list")
+        start = int(pageToken or 0)
+        items = self.playlists_items.get(playlistId, [])
+        page = items[start : start + maxResults]
+        response = {"items": [{"contentDetails": {"videoId": v}} for v in page]}
+        if start + maxResults < len(items):
+            response["nextPageToken"] = str(start + maxResults)
+        return response
+
+    def _list_videos(self, id: str, **_) -> Dict[str, Any]:
+        self._call("videos.list")
+        return {
+            "items": [
+                {"id": video_id, "status": {"uploadStatus": "processed"}}
+                for video_id in id.split(",")
+            ]
+        }
+
+    def _search(self, q: str, **_) -> Dict[str, Any]:
+        self._call("search.list")
+        return {
+            "items": [{"id": {"kind": "youtube#video", "videoId": video_id_for(q)}}]
+        }
+
+    def playlists(self) -> FakeResource:
+        return FakeResource(self, {"insert": self._insert_playlist})
+
+    def playlistItems(self) -> FakeResource:
+        return FakeResource(
+            self, {"insert": self._insert_item, "list": self._list_items}
+        )
+
+    def videos(self) -> FakeResource:
+        return FakeResource(self, {"list": self._list_videos})
+
+    def search(self) -> FakeResource:
+        return FakeResource(self, {"list": self._search})
+
+    def new_batch_http_request(self, callback: Callable) -> FakeBatch:
+        return FakeBatch(self, callback)
+
+
+class FakeResolver(Resolver):
+    """
+    Resolves every track to a stable made-up id after `latency` seconds (+- `jitter`). A `miss_rate`
+    share of the tracks is never found.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        miss_rate: float = 0.0,
+        seed: Optional[int] = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.miss_rate = miss_rate
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def resolve(self, track: Track) -> str:
+        with self._lock:
+            delay = max(
+                self.latency + self.random.uniform(-self.jitter, self.jitter), 0
+            )
+        time.sleep(delay)
+        video_id = video_id_for(f"{track.title} {' '.join(track.extract_artists())}")
+        # misses depend on the track only, so repeated runs miss the same tracks
+        if int(video_id, 16) % 10000 < self.miss_rate * 10000:
+            raise VideoNotFoundException("No suitable video found.")
+        return video_id
@@ -0,0 +1,43 @@
+"""
+Fill a SQLite cache with synthetic tracks, the same tracks the Spotify stand-in serves.
+"""
+import argparse
+import time
+
+from benchmarks.fake_youtube import video_id_for
+from benchmarks.spotify_server import ARTISTS
+from src import metrics
+from src.database.connection import Database, STdb
+from src.spotify.models import Artist, Track
+
+BATCH_SIZE = 5000
+
+
+def synthetic_track(number: int) -> Track:
+    return Track(f"Track {number}", [Artist(f"Artist {number % ARTISTS}")])
+
+
+def generate(database: STdb, size: int, start: int = 0) -> float:
+    """
+    Store tracks `start` to `start + size` in batches. Returns the elapsed seconds.
+    """
+    began = time.perf_counter()
+    for first in range(start, start + size, BATCH_SIZE):
+        batch = [
+            (track, video_id_for(f"{track.title} {' '.join(track.extract_artists())}"))
+            for track in map(
+                synthetic_track, range(first, min(first + BATCH_SIZE, start + size))
+            )
+        ]
+        with metrics.timer("db.add_tracks"):
+            database.add_tracks(batch)
+    return time.perf_counter() - began
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic track cache.")
+    parser.add_argument("--db", default="sqlite:///benchmark.db")
+    parser.add_argument("--size", type=int, default=10000)
+    args = parser.parse_args()
+    elapsed = generate(STdb(Database(args.db)), args.size)
+    print(f"{args.size} tracks in {elapsed:.2f}s ({args.size / elapsed:.0f} tracks/s)")
@@ -0,0 +1,149 @@
+"""
+Offline benchmark of the cache and of a full transfer, nothing leaves the machine.
+
+    python -m benchmarks.run --cache-size 100000 --tracks 2000 --hit-rate 0.8
+
+Prints the throughput and the p50/p95 latency per stage as JSON, compare the numbers of two commits
+run with the same arguments.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Any, Dict
+from unittest.mock import patch
+
+from benchmarks.fake_youtube import FakeResolver, FakeYouTubeClient
+from benchmarks.generate_cache import generate, synthetic_track
+from benchmarks.spotify_server import serve
+from src import metrics
+from src.database.connection import Database, STdb
+from src.spot_tube import SpotTube
+from src.youtube.api import ApiOperation, Youtube
+from src.youtube.resolver import AdaptiveResolver
+
+LOOKUP_CHUNK = 100
+
+
+class OfflineYoutube(Youtube):
+    def __init__(
+        self, *args, client: FakeYouTubeClient, resolver: FakeResolver, **kwargs
+    ):
+        self.client = client
+        self.fake_resolver = resolver
+        super().__init__(*args, **kwargs)
+
+    def _build_google_api_client(self):
+        return self.client
+
+    def _build_resolver(self):
+        # the real chooser, with the fake as its only backend
+        return AdaptiveResolver([self.fake_resolver])
+
+
+def bench_cache(database: STdb, cache_size: int, rounds: int) -> Dict[str, Any]:
+    recorder = metrics.enable()
+    recorder.reset()
+    elapsed = generate(database, cache_size)
+    inserts = recorder.summary(cache_size, elapsed)
+
+    recorder.reset()
+    rng = random.Random(0)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        chunk = [
+            synthetic_track(rng.randrange(cache_size)) for _ in range(LOOKUP_CHUNK)
+        ]
+        with metrics.timer("db.search_tracks"):
+            database.search_tracks(chunk)
+    lookups = recorder.summary(rounds * LOOKUP_CHUNK, time.perf_counter() - started)
+    return {"insert": inserts, "lookup": lookups}
+
+
+def bench_transfer(database: STdb, args) -> Dict[str, Any]:
+    server = serve(latency=args.spotify_latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = FakeYouTubeClient(latency=args.api_latency, error_rate=args.error_rate)
+    resolver = FakeResolver(
+        latency=args.resolver_latency,
+        jitter=args.resolver_latency / 2,
+        miss_rate=args.miss_rate,
+    )
+
+    def build_youtube(*youtube_args, **kwargs):
+        return OfflineYoutube(*youtube_args, client=client, resolver=resolver, **kwargs)
+
+    with patch("src.spot_tube.Youtube", build_youtube):
+        app = SpotTube(
+            "benchmark",
+            "benchmark",
+            "credentials.json",
+            database,
+            resolver_workers=args.workers,
+            daily_quota=10**9,
+        )
+    app.spotify.PLAYLIST_URL = f"{base_url}/v1/playlists/"
+    app.spotify.token_manager.TOKEN_URL = f"{base_url}/api/token"
+
+    # the first hits come from the cache, the rest are tracks it has never seen
+    hits = int(args.tracks * args.hit_rate)
+    playlist_id = f"{args.tracks}-{args.cache_size - hits}"
+
+    recorder = metrics.enable()
+    recorder.reset()
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(
+        sys.stderr if args.verbose else devnull
+    ):
+        app.do_transfer(playlist_id)
+        summary = recorder.summary(app.report.inserted, time.perf_counter() - started)
+        app.close()
+    summary["api_calls"] = client.calls
+    server.shutdown()
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks.")
+    parser.add_argument("--cache-size", type=int, default=10000)
+    parser.add_argument("--lookup-rounds", type=int, default=200)
+    parser.add_argument("--tracks", type=int, default=500)
+    parser.add_argument("--hit-rate", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--resolver-latency", type=float, default=0.02)
+    parser.add_argument("--miss-rate", type=float, default=0.05)
+    parser.add_argument("--api-latency", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--spotify-latency", type=float, default=0.005)
+    parser.add_argument("--backoff", type=float, default=0.01, help="Base retry delay")
+    parser.add_argument("--db", help="SQLite file, a temporary one by default")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the app output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database = STdb(
+            Database(f"sqlite:///{args.db or os.path.join(tmp_dir, 'bench.db')}")
+        )
+        # the injected errors are retried after a short backoff, the real one would dominate the numbers
+        with patch.object(ApiOperation, "BASE_DELAY", args.backoff):
+            results = {
+                "cache": bench_cache(database, args.cache_size, args.lookup_rounds),
+                "transfer": bench_transfer(database, args),
+            }
+        database.db.engine.dispose()
+    metrics.disable()
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+
+
+if __name__ == "__main__":
+    main()
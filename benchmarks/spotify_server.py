@@ -0,0 +1,122 @@
+"""
+Local stand-in for the Spotify token and playlist endpoints.
+
+A playlist id encodes its content, `<count>-<first>` is a playlist of `count` tracks starting with
+track number `first`. Track n is "Track n" by "Artist n % ARTISTS", the same tracks that
+`generate_cache` stores, so the cache hit rate of a benchmark is picked with the playlist id.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+ARTISTS = 500
+PAGE_SIZE = 100
+
+
+def track_item(number: int) -> Dict[str, Any]:
+    return {
+        "track": {
+            "id": f"track{number}",
+            "name": f"Track {number}",
+            "duration_ms": 180000 + number % 60000,
+            "artists": [{"name": f"Artist {number % ARTISTS}"}],
+        }
+    }
+
+
+def parse_playlist_id(playlist_id: str) -> Optional[List[int]]:
+    try:
+        count, first = (int(part) for part in playlist_id.split("-"))
+    except ValueError:
+        return None
+    return [count, first]
+
+
+class SpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # seconds added to every response, set by `serve`
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.path != "/api/token":
+            return self._send(404, {"error": {"status": 404}})
+        self._send(200, {"access_token": "benchmark", "expires_in": 3600})
+
+    def _page(self, playlist_id: str, count: int, first: int, offset: int, limit: int):
+        end = min(offset + limit, count)
+        next_url = None
+        if end < count:
+            host = self.headers.get("Host")
+            next_url = f"http://{host}/v1/playlists/{playlist_id}/tracks?offset={end}&limit={limit}"
+        return {
+            "items": [track_item(first + index) for index in range(offset, end)],
+            "total": count,
+            "next": next_url,
+        }
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+        if len(parts) < 3 or parts[:2] != ["v1", "playlists"]:
+            return self._send(404, {"error": {"status": 404}})
+        playlist_id = parts[2]
+        parsed = parse_playlist_id(playlist_id)
+        if parsed is None:
+            return self._send(404, {"error": {"status": 404, "message": "Not found"}})
+        count, first = parsed
+
+        offset = int(query.get("offset", ["0"])[0])
+        limit = min(int(query.get("limit", [str(PAGE_SIZE)])[0]), PAGE_SIZE)
+        if len(parts) == 4 and parts[3] == "tracks":
+            return self._send(200, self._page(playlist_id, count, first, offset, limit))
+        self._send(
+            200,
+            {
+                "name": f"Benchmark {playlist_id}",
+                "description": "",
+                "snapshot_id": f"snapshot-{playlist_id}",
+                "tracks": self._page(playlist_id, count, first, 0, PAGE_SIZE),
+            },
+        )
+
+
+def serve(port: int = 0, latency: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Start the server in a daemon thread. Returns the server, `server.server_address` has the port.
+    """
+    handler = type("Handler", (SpotifyHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a fake Spotify API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    server = serve(args.port, args.latency)
+    print(f"Listening on http://127.0.0.1:{server.server_address[1]}")
+    threading.Event().wait()
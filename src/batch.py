@@ -0,0 +1,101 @@
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from dataclasses import asdict
+from multiprocessing import util
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.spot_tube import SpotTube
+
+# the app of the worker process, built once and reused for every playlist it gets
+_app: Optional[SpotTube] = None
+
+
+def read_playlist_ids(lines: Iterable[str]) -> List[str]:
+    """
+    Read playlist ids one per line, blank lines and lines starting with # are skipped.
+    """
+    ids = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            ids.append(line)
+    return ids
+
+
+def authorize_youtube() -> None:
+    """
+    Get the YouTube credentials before the workers start, so the consent flow runs once in this
+    process and the workers read the stored token.
+    """
+    from src.main import YT_CREDENTIAL_FILE_NAME, YT_TOKEN_FILE
+    from src.youtube.api import Youtube
+    from src.youtube.auth import load_credentials
+
+    if not YT_TOKEN_FILE:
+        raise ValueError(
+            "YT_TOKEN_FILE is required to share the credentials with workers."
+        )
+    load_credentials(YT_CREDENTIAL_FILE_NAME, Youtube.SCOPE, YT_TOKEN_FILE)
+
+
+def _init_worker() -> None:
+    global _app
+    from src.main import create_app
+
+    with redirect_stdout(sys.stderr):
+        _app = create_app(interactive_auth=False)
+    # pool workers leave through os._exit, so atexit would never quit the browsers
+    util.Finalize(_app, _app.close, exitpriority=10)
+
+
+def process_playlist(playlist_id: str, update: bool = False) -> Dict[str, Any]:
+    start = time.perf_counter()
+    # stdout is reserved for the summary, progress goes to stderr
+    with redirect_stdout(sys.stderr):
+        try:
+            if update:
+                _app.do_update(playlist_id)
+            else:
+                _app.do_transfer(playlist_id)
+            result = asdict(_app.report)
+            result["error"] = None
+        except Exception as e:
+            result = {"playlist_id": playlist_id, "ok": False, "error": repr(e)}
+    result["elapsed"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_batch(
+    playlist_ids: List[str], workers: int = 1, update: bool = False
+) -> Dict[str, Any]:
+    """
+    Transfer (or update) many playlists in parallel worker processes sharing one database.
+    Returns:
+        Dict[str, Any]:             The machine readable summary of the batch.
+    """
+    start = time.perf_counter()
+    results = []
+    with redirect_stdout(sys.stderr):
+        authorize_youtube()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(process_playlist, pid, update) for pid in playlist_ids]
+        for future in as_completed(futures):
+            result = future.result()
+            print(
+                f"{result['playlist_id']}: {'ok' if result['ok'] else 'failed'}",
+                file=sys.stderr,
+            )
+            results.append(result)
+
+    order = {pid: index for index, pid in enumerate(playlist_ids)}
+    results.sort(key=lambda result: order[result["playlist_id"]])
+    return {
+        "playlists": results,
+        "succeeded": sum(result["ok"] for result in results),
+        "failed": sum(not result["ok"] for result in results),
+        "inserted": sum(result.get("inserted", 0) for result in results),
+        "skipped": sum(len(result.get("skipped", [])) for result in results),
+        "elapsed": round(time.perf_counter() - start, 3),
+    }
@@ -0,0 +1,55 @@
+import gzip
+import json
+from itertools import islice
+from typing import Any, Dict, Iterator
+
+from src.database.connection import STdb
+
+REQUIRED_FIELDS = {"title", "artists", "youtube_id"}
+
+
+def export_cache(database: STdb, path: str) -> int:
+    """
+    Write the cached tracks to a gzip compressed JSON lines file, one track per line.
+    Returns:
+        int:                        The number of exported tracks.
+    """
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        for record in database.export_tracks():
+            file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            file.write("\n")
+            count += 1
+    return count
+
+
+def _read_records(path: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: invalid record: {e}") from e
+            if not isinstance(record, dict) or not REQUIRED_FIELDS.issubset(record):
+                fields = ", ".join(sorted(REQUIRED_FIELDS))
+                raise ValueError(f"{path}:{number}: a record needs {fields}")
+            yield record
+
+
+def import_cache(database: STdb, path: str, batch_size: int = 5000) -> Dict[str, int]:
+    """
+    Merge a file written by `export_cache` into the cache. Every batch is committed on its own, so only
+    one batch is held in memory and an interrupted import can simply be run again.
+    Returns:
+        Dict[str, int]:             The number of read, inserted and merged tracks.
+    """
+    summary = {"read": 0, "inserted": 0, "merged": 0}
+    records = _read_records(path)
+    while batch := list(islice(records, batch_size)):
+        result = database.import_tracks(batch)
+        summary["read"] += len(batch)
+        summary["inserted"] += result["inserted"]
+        summary["merged"] += result["merged"]
+    return summary
@@ -1,53 +1,222 @@
+import threading
 from collections import Counter
-from typing import Optional, Tuple
+from datetime import datetime
+from difflib import SequenceMatcher
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from sqlalchemy import create_engine
+from cachetools import LRUCache
+from sqlalchemy import (
+    DateTime,
+    bindparam,
+    case,
+    create_engine,
+    event,
+    func,
+    inspect,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
-from src.database.models import Artist, Base, Track
+from src import metrics
+from src.database.migrations import migrate
+from src.database.models import (
+    Artist,
+    Base,
+    MissingTrack,
+    PlaylistEntry,
+    PlaylistSnapshot,
+    QuotaUsage,
+    Track,
+    TransferItem,
+    TransferJob,
+    association_table,
+)
+from src.database.normalize import (
+    MATCH_ARTIST_SEPARATOR,
+    make_match_fields,
+    make_track_key,
+)
+from src.database.writer import BatchWriter
 from src.spotify.models import Artist as SpotifyArtist
+from src.spotify.models import Playlist as SpotifyPlaylist
 from src.spotify.models import Track as SpotifyTrack
 
 Session = sessionmaker()
 
+# SQLite limits the number of bound parameters, so IN (...) lists are split into chunks
+CHUNK_SIZE = 500
+
+
+def chunked(items: Sequence, size: int = CHUNK_SIZE) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
 
 class Database:
+    # applied to every new connection. WAL lets readers work during a write and commits append to the
+    # log, with synchronous=NORMAL a commit doesn't wait for fsync (only a power loss may undo the last ones)
+    PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        # batch workers share the file, wait for the lock instead of failing at once
+        "busy_timeout": 30000,
+        "temp_store": "MEMORY",
+        # in KiB when negative
+        "cache_size": -20000,
+    }
+
     def __init__(self, db_name="sqlite:///spotTube.db"):
-        self.engine = create_engine(db_name)
+        url = make_url(db_name)
+        if url.database in (None, "", ":memory:"):
+            # an in-memory database lives in its connection, so every thread has to share it
+            self.engine = create_engine(
+                url, connect_args={"check_same_thread": False}, poolclass=StaticPool
+            )
+        else:
+            self.engine = create_engine(url, connect_args={"timeout": 30})
+        event.listen(self.engine, "connect", self._set_pragmas)
+        # sessions of the threads using the database, a stack per thread for nested blocks
+        self._local = threading.local()
 
         self.__bind_engine(self.engine)
+        fresh = not inspect(self.engine).has_table(Track.__tablename__)
         Base.metadata.create_all(self.engine)
+        migrate(self.engine, fresh)
 
     def __bind_engine(self, engine):
         Base.metadata.bind = engine
         Session.configure(bind=engine)
 
+    @classmethod
+    def _set_pragmas(cls, dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in cls.PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
     def __enter__(self):
-        self.session = Session()
-        return self.session
+        session = Session()
+        self._local.__dict__.setdefault("sessions", []).append(session)
+        return session
 
     def __exit__(self, exc_type, exc_val, traceback):
-        if exc_type is not None:
-            self.session.rollback()
-        else:
-            self.session.commit()
-        self.session.close()
+        session = self._local.sessions.pop()
+        try:
+            if exc_type is not None:
+                session.rollback()
+            else:
+                session.commit()
+        finally:
+            session.close()
 
 
 class ArtistManager:
-    def get_or_create_artist(self, session: Session, artist_name: str) -> Artist:
-        instance = session.query(Artist).filter_by(name=artist_name).first()
-        if instance:
-            return instance
-        else:
-            instance = Artist(name=artist_name)
-            session.add(instance)
-            return instance
+    def __init__(self, cache_size: int = 10000):
+        # name -> id of artists known to be committed
+        self.cache: LRUCache = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+
+    def warm(self, session: Session) -> None:
+        """
+        Fill the cache with the artists having the most tracks.
+        """
+        query = (
+            session.query(Artist.name, Artist.id)
+            .join(association_table, association_table.c.artist_id == Artist.id)
+            .group_by(Artist.id)
+            .order_by(func.count().desc())
+            .limit(self.cache.maxsize)
+        )
+        with self._lock:
+            for name, pk in query:
+                self.cache[name] = pk
+
+    def _select_ids(self, session: Session, names: Sequence[str]) -> Dict[str, int]:
+        found = {}
+        for names_chunk in chunked(names):
+            query = session.query(Artist.name, Artist.id).filter(
+                Artist.name.in_(names_chunk)
+            )
+            found.update(query)
+        return found
+
+    def get_artist_ids(self, session: Session, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Methods to get ids of artists, artists that don't exist are created with one bulk insert.
+        Args:
+            session:                    Session
+            names (Iterable[str]):      The names of artists.
+        Returns:
+            Dict[str, int]:             Maps the name of artist to its id.
+        """
+        ids = {}
+        missing = []
+        with self._lock:
+            for name in set(names):
+                pk = self.cache.get(name)
+                if pk is None:
+                    missing.append(name)
+                else:
+                    ids[name] = pk
+        if not missing:
+            return ids
+
+        found = self._select_ids(session, missing)
+        new_names = [name for name in missing if name not in found]
+        pending = session.info.get("new_artists", {})
+        committed = {name: pk for name, pk in found.items() if name not in pending}
+        if new_names:
+            # another writer may insert the same artist meanwhile, the unique name settles it
+            statement = sqlite_insert(Artist.__table__).on_conflict_do_nothing(
+                index_elements=["name"]
+            )
+            session.execute(statement, [{"name": name} for name in new_names])
+            created = self._select_ids(session, new_names)
+            found.update(created)
+            self._publish_on_commit(session, created)
+
+        with self._lock:
+            self.cache.update(committed)
+        ids.update(found)
+        return ids
+
+    def _publish_on_commit(self, session: Session, created: Dict[str, int]) -> None:
+        # ids of new artists are cached only once they are committed, a rollback would make them dangling
+        pending = session.info.setdefault("new_artists", {})
+        if not pending:
+            event.listen(session, "after_commit", self._publish, once=True)
+            event.listen(session, "after_rollback", self._discard, once=True)
+        pending.update(created)
+
+    def _publish(self, session: Session) -> None:
+        with self._lock:
+            self.cache.update(session.info.pop("new_artists", {}))
+
+    def _discard(self, session: Session) -> None:
+        session.info.pop("new_artists", None)
 
 
 class TrackManager:
-    def __init__(self, artist_manager: ArtistManager):
+    # candidates read from the trigram index per track, best ranked first
+    FUZZY_CANDIDATES = 20
+
+    def __init__(
+        self, artist_manager: ArtistManager, fuzzy_threshold: Optional[float] = 0.85
+    ):
+        """
+        Args:
+            artist_manager (ArtistManager):     The artist manager.
+            fuzzy_threshold (Optional[float]):  Minimal similarity (0-1) of a near duplicate found by
+                                                the fuzzy lookup, None turns the fuzzy lookup off.
+        """
         self.artist_manager = artist_manager
+        self.fuzzy_threshold = fuzzy_threshold
 
     def search_track(
         self, session: Session, track: SpotifyTrack
@@ -60,26 +229,127 @@ class TrackManager:
         Returns:
             Optional[Tuple[int, str]]:  The tuple of id and youtube_id track if found, otherwise None.
         """
-        artists = track.extract_artists()
-        track_query = (
-            session.query(Track)
-            .join(Track.artists)
-            .filter(Artist.name.in_(artists), Track.title == track.title)
-            .all()
-        )
-        main_artists = Counter(artists)
-        # looking for track
-        for music in track_query:
-            track_artists = Counter([singer.name for singer in music.artists])
-            if track_artists == main_artists:
-                return music.id, music.youtube_id
-        return None
+        return self.search_tracks(session, [track]).get(0)
+
+    def search_tracks(
+        self, session: Session, tracks: Sequence[SpotifyTrack]
+    ) -> Dict[int, Tuple[int, str]]:
+        """
+        Methods to search many tracks at once. It runs one indexed query per chunk of keys
+        instead of a query per track. Tracks without an exact match are looked up again by their
+        simplified title and artists, see `search_similar`.
+        Args:
+            session:                    Session
+            tracks (Sequence[SpotifyTrack]):    The tracks to search.
+        Returns:
+            Dict[int, Tuple[int, str]]: Maps the index of every found track to the tuple of id and youtube_id.
+        """
+        keys = [
+            make_track_key(track.title, track.extract_artists()) for track in tracks
+        ]
+        found = {}
+        for keys_chunk in chunked(list(set(keys))):
+            query = session.query(Track.track_key, Track.id, Track.youtube_id).filter(
+                Track.track_key.in_(keys_chunk), Track.dead.is_(False)
+            )
+            for key, pk, youtube_id in query:
+                found[key] = (pk, youtube_id)
+
+        result = {index: found[key] for index, key in enumerate(keys) if key in found}
+        if self.fuzzy_threshold is not None and len(result) < len(tracks):
+            unknown = [index for index in range(len(tracks)) if index not in result]
+            similar = self.search_similar(session, [tracks[index] for index in unknown])
+            result.update({unknown[index]: entry for index, entry in similar.items()})
+            metrics.count("cache.fuzzy_hit", len(similar))
+        return result
+
+    def search_similar(
+        self, session: Session, tracks: Sequence[SpotifyTrack]
+    ) -> Dict[int, Tuple[int, str]]:
+        """
+        Methods to find stored versions of the tracks under another name, e.g. "Song - Remastered 2011"
+        or "Song (feat. X)" for "Song". The simplified title and artists are compared exactly first,
+        the rest is matched against the trigram index and accepted above `fuzzy_threshold`.
+        Args:
+            session:                    Session
+            tracks (Sequence[SpotifyTrack]):    The tracks to search.
+        Returns:
+            Dict[int, Tuple[int, str]]: Maps the index of every found track to the tuple of id and youtube_id.
+        """
+        fields = [
+            make_match_fields(track.title, track.extract_artists()) for track in tracks
+        ]
+        found = {}
+        for fields_chunk in chunked(list(set(fields))):
+            query = session.query(
+                Track.match_title, Track.match_artists, Track.id, Track.youtube_id
+            ).filter(
+                tuple_(Track.match_title, Track.match_artists).in_(fields_chunk),
+                Track.dead.is_(False),
+            )
+            for match_title, match_artists, pk, youtube_id in query:
+                found.setdefault((match_title, match_artists), (pk, youtube_id))
+
+        result = {}
+        for index, match in enumerate(fields):
+            entry = found.get(match)
+            if entry is None:
+                entry = self._search_fuzzy(session, *match)
+            if entry is not None:
+                result[index] = entry
+        return result
+
+    @staticmethod
+    def _fts_phrase(column: str, value: str) -> str:
+        escaped = value.replace('"', '""')
+        return f'{column} : "{escaped}"'
+
+    @staticmethod
+    def _numbers(match_title: str) -> List[str]:
+        return [word for word in match_title.split() if any(map(str.isdigit, word))]
+
+    def _search_fuzzy(
+        self, session: Session, match_title: str, match_artists: str
+    ) -> Optional[Tuple[int, str]]:
+        # a trigram index can't match words shorter than three characters
+        words = [word for word in match_title.split() if len(word) >= 3]
+        if not words:
+            return None
+        # every word has to be in the title, the candidates stay few even for common words
+        query = " AND ".join(self._fts_phrase("match_title", word) for word in words)
+        first_artist = match_artists.split(MATCH_ARTIST_SEPARATOR)[0]
+        if len(first_artist) >= 3:
+            query += " AND " + self._fts_phrase("match_artists", first_artist)
+
+        candidates = session.execute(
+            text(
+                "SELECT t.id, t.youtube_id, t.match_title, t.match_artists "
+                "FROM track_fts JOIN track_table t ON t.id = track_fts.rowid "
+                "WHERE track_fts MATCH :query AND NOT t.dead "
+                "ORDER BY track_fts.rank LIMIT :limit"
+            ),
+            {"query": query, "limit": self.FUZZY_CANDIDATES},
+        )
+        numbers = self._numbers(match_title)
+        best, best_score = None, self.fuzzy_threshold
+        for pk, youtube_id, title, artists in candidates:
+            # "Part 1" and "Part 2" are close but different tracks
+            if self._numbers(title) != numbers:
+                continue
+            # both the title and the artists have to be close
+            score = min(
+                SequenceMatcher(None, match_title, title).ratio(),
+                SequenceMatcher(None, match_artists, artists).ratio(),
+            )
+            if score >= best_score:
+                best, best_score = (pk, youtube_id), score
+        return best
 
     def add_track(
         self, session: Session, new_track: SpotifyTrack, youtube_id: str
     ) -> None:
         """
-        Methods to add a new track
+        Methods to add a new track. It is skipped when the track is already stored.
         Args:
             session:                    Session
             new_track (SpotifyTrack):       The track to add.
@@ -87,38 +357,769 @@ class TrackManager:
         Returns:
             None
         """
-        artists = [
-            self.artist_manager.get_or_create_artist(session, art.name)
-            for art in new_track.artists
-        ]
+        self.add_tracks(session, [(new_track, youtube_id)])
+
+    def add_tracks(
+        self, session: Session, new_tracks: Iterable[Tuple[SpotifyTrack, str]]
+    ) -> None:
+        """
+        Methods to add many tracks in one transaction using bulk inserts for artists, tracks and
+        association rows. Tracks repeated in the batch or already stored are skipped, a stored track
+        whose video is dead gets the new video id.
+        Args:
+            session:                    Session
+            new_tracks (Iterable[Tuple[SpotifyTrack, str]]):    Pairs of track and its YouTube video id.
+        Returns:
+            None
+        """
+        unique = {}
+        for new_track, youtube_id in new_tracks:
+            key = make_track_key(new_track.title, new_track.extract_artists())
+            unique.setdefault(key, (new_track, youtube_id))
+        if not unique:
+            return
 
-        new_track = Track(title=new_track.title, youtube_id=youtube_id)
-        new_track.artists.extend([*artists])
-        session.add(new_track)
+        artist_ids = self.artist_manager.get_artist_ids(
+            session,
+            (name for track, _ in unique.values() for name in track.extract_artists()),
+        )
+
+        revive = (
+            update(Track.__table__)
+            .where(
+                Track.__table__.c.track_key == bindparam("key"),
+                Track.__table__.c.dead.is_(True),
+            )
+            .values(youtube_id=bindparam("video_id"), dead=False, validated_at=None)
+        )
+        # tracks already stored (also by a concurrent writer) are skipped by the unique key
+        statement = (
+            sqlite_insert(Track.__table__)
+            .on_conflict_do_nothing(index_elements=["track_key"])
+            .returning(Track.__table__.c.id, Track.__table__.c.track_key)
+        )
+        for chunk in chunked(list(unique.items())):
+            rows = []
+            for key, (track, youtube_id) in chunk:
+                match_title, match_artists = make_match_fields(
+                    track.title, track.extract_artists()
+                )
+                rows.append(
+                    {
+                        "title": track.title,
+                        "track_key": key,
+                        "youtube_id": youtube_id,
+                        "match_title": match_title,
+                        "match_artists": match_artists,
+                    }
+                )
+            session.execute(
+                revive,
+                [
+                    {"key": key, "video_id": youtube_id}
+                    for key, (_, youtube_id) in chunk
+                ],
+            )
+            inserted = session.execute(statement, rows).all()
+            associations = [
+                {"artist_id": artist_ids[name], "track_id": pk}
+                for pk, key in inserted
+                for name in unique[key][0].extract_artists()
+            ]
+            if associations:
+                session.execute(association_table.insert(), associations)
 
     def update_upload(self, session: Session, pk: int) -> None:
         track = session.query(Track).filter(Track.id == pk).first()
         track.uploaded += 1
 
+    def update_uploads(self, session: Session, pks: Iterable[int]) -> None:
+        """
+        Methods to increase the upload counter of many tracks. A pk repeated n times is increased by n.
+        """
+        by_count: Dict[int, List[int]] = {}
+        for pk, count in Counter(pks).items():
+            by_count.setdefault(count, []).append(pk)
+        for count, ids in by_count.items():
+            for ids_chunk in chunked(ids):
+                session.query(Track).filter(Track.id.in_(ids_chunk)).update(
+                    {Track.uploaded: Track.uploaded + count},
+                    synchronize_session=False,
+                )
+
+
+class ValidationManager:
+    def get_unvalidated(
+        self, session: Session, max_age_days: int, limit: Optional[int] = None
+    ) -> List[Tuple[int, str]]:
+        """
+        Methods to list the live tracks not validated within `max_age_days`, never validated tracks first.
+        Returns:
+            List[Tuple[int, str]]:      The tuples of id and youtube_id.
+        """
+        query = (
+            session.query(Track.id, Track.youtube_id)
+            .filter(
+                Track.dead.is_(False),
+                (Track.validated_at.is_(None))
+                | (
+                    Track.validated_at
+                    < func.datetime("now", f"-{int(max_age_days)} days")
+                ),
+            )
+            .order_by(Track.validated_at.is_not(None), Track.validated_at, Track.id)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return [(pk, youtube_id) for pk, youtube_id in query]
+
+    def mark_validated(
+        self, session: Session, alive: Iterable[int], dead: Iterable[int]
+    ) -> None:
+        """
+        Methods to store the result of a validation, dead tracks are not returned by the searches anymore.
+        """
+        for pks, is_dead in ((list(alive), False), (list(dead), True)):
+            for ids_chunk in chunked(pks):
+                session.query(Track).filter(Track.id.in_(ids_chunk)).update(
+                    {Track.validated_at: func.now(), Track.dead: is_dead},
+                    synchronize_session=False,
+                )
+
+
+class MissingTrackManager:
+    def search_missing(
+        self, session: Session, tracks: Sequence[SpotifyTrack]
+    ) -> Dict[int, str]:
+        """
+        Methods to find tracks remembered as not found on YouTube, expired entries are ignored.
+        Returns:
+            Dict[int, str]:             Maps the index of every missing track to the reason.
+        """
+        keys = [
+            make_track_key(track.title, track.extract_artists()) for track in tracks
+        ]
+        found = {}
+        for keys_chunk in chunked(list(set(keys))):
+            query = session.query(MissingTrack.track_key, MissingTrack.reason).filter(
+                MissingTrack.track_key.in_(keys_chunk),
+                MissingTrack.expires_at > func.now(),
+            )
+            found.update(query)
+        return {index: found[key] for index, key in enumerate(keys) if key in found}
+
+    def add_missing(
+        self,
+        session: Session,
+        misses: Iterable[Tuple[SpotifyTrack, str]],
+        ttl_days: int,
+    ) -> None:
+        """
+        Methods to remember tracks that couldn't be found, for `ttl_days` days.
+        Args:
+            session:                    Session
+            misses (Iterable[Tuple[SpotifyTrack, str]]):    Pairs of track and the reason.
+            ttl_days (int):             How long the miss is remembered.
+        Returns:
+            None
+        """
+        rows = {
+            make_track_key(track.title, track.extract_artists()): {
+                "track_key": make_track_key(track.title, track.extract_artists()),
+                "title": str(track),
+                "reason": reason,
+            }
+            for track, reason in misses
+        }
+        if not rows:
+            return
+        expires_at = func.datetime("now", f"+{int(ttl_days)} days")
+        statement = sqlite_insert(MissingTrack.__table__).values(expires_at=expires_at)
+        statement = statement.on_conflict_do_update(
+            index_elements=["track_key"],
+            set_={
+                "reason": statement.excluded.reason,
+                "created_at": func.now(),
+                "expires_at": expires_at,
+            },
+        )
+        session.execute(statement, list(rows.values()))
+
+
+class QuotaManager:
+    def get_usage(self, session: Session, day: str) -> int:
+        usage = session.get(QuotaUsage, day)
+        return usage.units if usage else 0
+
+    def add_usage(self, session: Session, day: str, units: int) -> None:
+        statement = sqlite_insert(QuotaUsage.__table__).values(day=day, units=units)
+        # concurrent runs add to the same row
+        statement = statement.on_conflict_do_update(
+            index_elements=["day"],
+            set_={"units": QuotaUsage.__table__.c.units + statement.excluded.units},
+        )
+        session.execute(statement)
+
+    def reserve_usage(self, session: Session, day: str, units: int, limit: int) -> bool:
+        if units > limit:
+            return False
+        table = QuotaUsage.__table__
+        statement = sqlite_insert(table).values(day=day, units=units)
+        # the units are added only if they still fit, other runs may reserve at the same time
+        statement = statement.on_conflict_do_update(
+            index_elements=["day"],
+            set_={"units": table.c.units + statement.excluded.units},
+            where=table.c.units + statement.excluded.units <= limit,
+        ).returning(table.c.units)
+        return session.execute(statement).first() is not None
+
+
+class PlaylistManager:
+    def save_playlist(
+        self, session: Session, spotify_playlist_id: str, playlist: SpotifyPlaylist
+    ) -> None:
+        """
+        Methods to store the playlist with its tracks in order, replacing the stored version.
+        Args:
+            session:                    Session
+            spotify_playlist_id (str):  The id of the playlist on Spotify.
+            playlist (SpotifyPlaylist): The fully loaded playlist.
+        Returns:
+            None
+        """
+        tracks = playlist.load()
+        header = {
+            "spotify_playlist_id": spotify_playlist_id,
+            "name": playlist.name,
+            "description": playlist.description or "",
+            "snapshot_id": playlist.snapshot_id,
+            "track_count": len(tracks),
+        }
+        statement = sqlite_insert(PlaylistSnapshot.__table__).values(**header)
+        statement = statement.on_conflict_do_update(
+            index_elements=["spotify_playlist_id"],
+            set_={**header, "updated_at": func.now()},
+        ).returning(PlaylistSnapshot.__table__.c.id)
+        playlist_pk = session.execute(statement).scalar_one()
+
+        session.query(PlaylistEntry).filter_by(playlist_id=playlist_pk).delete(
+            synchronize_session=False
+        )
+        rows = [
+            {
+                "playlist_id": playlist_pk,
+                "position": position,
+                "title": track.title,
+                "artists": PlaylistEntry.ARTIST_SEPARATOR.join(track.extract_artists()),
+                "track_key": make_track_key(track.title, track.extract_artists()),
+                "spotify_id": track.spotify_id,
+                "duration_ms": track.duration_ms,
+            }
+            for position, track in enumerate(tracks)
+        ]
+        for rows_chunk in chunked(rows):
+            session.execute(PlaylistEntry.__table__.insert(), rows_chunk)
+
+    def load_playlist(
+        self, session: Session, spotify_playlist_id: str
+    ) -> Optional[Tuple[SpotifyPlaylist, Dict[int, Tuple[int, str]]]]:
+        """
+        Methods to read a stored playlist together with the cached videos of its tracks, in one query.
+        Returns:
+            Optional[Tuple[SpotifyPlaylist, Dict[int, Tuple[int, str]]]]:   The playlist and the map of position
+                                                                            to the tuple of id and youtube_id of
+                                                                            the cached tracks, None when the
+                                                                            playlist isn't stored.
+        """
+        header = (
+            session.query(PlaylistSnapshot)
+            .filter_by(spotify_playlist_id=spotify_playlist_id)
+            .first()
+        )
+        if header is None:
+            return None
+        query = (
+            session.query(
+                PlaylistEntry.position,
+                PlaylistEntry.title,
+                PlaylistEntry.artists,
+                PlaylistEntry.spotify_id,
+                PlaylistEntry.duration_ms,
+                Track.id,
+                Track.youtube_id,
+            )
+            .outerjoin(
+                Track,
+                (Track.track_key == PlaylistEntry.track_key) & Track.dead.is_(False),
+            )
+            .filter(PlaylistEntry.playlist_id == header.id)
+            .order_by(PlaylistEntry.position)
+        )
+        tracks = []
+        found = {}
+        for position, title, artists, spotify_id, duration_ms, pk, youtube_id in query:
+            names = artists.split(PlaylistEntry.ARTIST_SEPARATOR) if artists else []
+            tracks.append(
+                SpotifyTrack(
+                    title,
+                    [SpotifyArtist(name) for name in names],
+                    spotify_id,
+                    duration_ms,
+                )
+            )
+            if pk is not None:
+                found[position] = (pk, youtube_id)
+        playlist = SpotifyPlaylist(
+            name=header.name,
+            description=header.description,
+            items=tracks,
+            snapshot_id=header.snapshot_id,
+            total=len(tracks),
+        )
+        return playlist, found
+
+
+class TransferJobManager:
+    def get_open_job(
+        self, session: Session, spotify_playlist_id: str
+    ) -> Optional[Tuple[int, str]]:
+        """
+        Methods to find the unfinished transfer of a playlist.
+        Returns:
+            Optional[Tuple[int, str]]:  The tuple of job id and YouTube playlist id, None when there is nothing to resume.
+        """
+        job = (
+            session.query(TransferJob.id, TransferJob.youtube_playlist_id)
+            .filter_by(
+                spotify_playlist_id=spotify_playlist_id, status=TransferJob.RUNNING
+            )
+            .order_by(TransferJob.id.desc())
+            .first()
+        )
+        return (job.id, job.youtube_playlist_id) if job else None
+
+    def get_last_job(
+        self, session: Session, spotify_playlist_id: str
+    ) -> Optional[Tuple[int, str, Optional[str], str]]:
+        """
+        Methods to find the latest transfer of a playlist, finished or not.
+        Returns:
+            Optional[Tuple[int, str, Optional[str], str]]:  The tuple of job id, YouTube playlist id, snapshot id
+                                                            and status, None when the playlist was never transferred.
+        """
+        job = (
+            session.query(
+                TransferJob.id,
+                TransferJob.youtube_playlist_id,
+                TransferJob.snapshot_id,
+                TransferJob.status,
+            )
+            .filter_by(spotify_playlist_id=spotify_playlist_id)
+            .order_by(TransferJob.id.desc())
+            .first()
+        )
+        return tuple(job) if job else None
+
+    def create_job(
+        self, session: Session, spotify_playlist_id: str, youtube_playlist_id: str
+    ) -> int:
+        job = TransferJob(
+            spotify_playlist_id=spotify_playlist_id,
+            youtube_playlist_id=youtube_playlist_id,
+        )
+        session.add(job)
+        session.flush()
+        return job.id
+
+    def finish_job(
+        self, session: Session, job_id: int, snapshot_id: Optional[str] = None
+    ) -> None:
+        session.query(TransferJob).filter_by(id=job_id).update(
+            {
+                TransferJob.status: TransferJob.DONE,
+                TransferJob.snapshot_id: snapshot_id,
+                TransferJob.updated_at: func.now(),
+            }
+        )
+
+    def inserted_keys(self, session: Session, job_id: int) -> Counter:
+        """
+        Methods to count the tracks already inserted by the job, by track key.
+        """
+        query = session.query(TransferItem.track_key).filter_by(
+            job_id=job_id, state=TransferItem.INSERTED
+        )
+        return Counter(key for (key,) in query)
+
+    def record_items(
+        self,
+        session: Session,
+        job_id: int,
+        items: Iterable[Tuple[int, str, Optional[str], str]],
+    ) -> None:
+        """
+        Methods to save the state of tracks of the job.
+        Args:
+            session:                    Session
+            job_id (int):               The id of the job.
+            items (Iterable[Tuple[int, str, Optional[str], str]]):  Tuples of position, track key, youtube_id and state.
+        Returns:
+            None
+        """
+        rows = [
+            {
+                "job_id": job_id,
+                "position": position,
+                "track_key": key,
+                "youtube_id": youtube_id,
+                "state": state,
+            }
+            for position, key, youtube_id, state in items
+        ]
+        if not rows:
+            return
+        statement = sqlite_insert(TransferItem.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=["job_id", "position"],
+            set_={
+                "track_key": statement.excluded.track_key,
+                "youtube_id": statement.excluded.youtube_id,
+                "state": statement.excluded.state,
+            },
+        )
+        session.execute(statement, rows)
+        session.query(TransferJob).filter_by(id=job_id).update(
+            {TransferJob.updated_at: func.now()}
+        )
+
+
+class CacheArchiveManager:
+    """
+    Reads and merges the whole track cache, for copying it to another database.
+    """
+
+    # rows held by the export cursor at once
+    EXPORT_BATCH_SIZE = 1000
+
+    def __init__(self, artist_manager: ArtistManager):
+        self.artist_manager = artist_manager
+
+    def export_tracks(self, session: Session) -> Iterator[Dict[str, Any]]:
+        """
+        Methods to stream the live tracks with their artists. The rows are fetched in batches from one
+        query, so the memory doesn't grow with the cache.
+        Returns:
+            Iterator[Dict[str, Any]]:   The records with title, artists, youtube_id, uploaded and
+                                        validated_at (ISO format or None).
+        """
+        query = (
+            session.query(
+                Track.id,
+                Track.title,
+                Track.youtube_id,
+                Track.uploaded,
+                Track.validated_at,
+                Artist.name,
+            )
+            .outerjoin(association_table, association_table.c.track_id == Track.id)
+            .outerjoin(Artist, Artist.id == association_table.c.artist_id)
+            .filter(Track.dead.is_(False))
+            .order_by(Track.id)
+            .yield_per(self.EXPORT_BATCH_SIZE)
+        )
+        for _, rows in groupby(query, key=lambda row: row.id):
+            rows = list(rows)
+            first = rows[0]
+            yield {
+                "title": first.title,
+                "artists": [row.name for row in rows if row.name is not None],
+                "youtube_id": first.youtube_id,
+                "uploaded": first.uploaded,
+                "validated_at": (
+                    first.validated_at.isoformat() if first.validated_at else None
+                ),
+            }
+
+    def import_tracks(
+        self, session: Session, records: Iterable[Dict[str, Any]]
+    ) -> Dict[str, int]:
+        """
+        Methods to merge exported records into the cache. New tracks are bulk inserted. A stored track
+        keeps its video and the higher upload count, unless its video is dead, then it gets the
+        imported one.
+        Args:
+            session:                    Session
+            records (Iterable[Dict[str, Any]]):     Records of `export_tracks`.
+        Returns:
+            Dict[str, int]:             The number of inserted and merged tracks.
+        """
+        unique: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            key = make_track_key(record["title"], record["artists"])
+            unique.setdefault(key, record)
+        summary = {"inserted": 0, "merged": 0}
+        if not unique:
+            return summary
+
+        artist_ids = self.artist_manager.get_artist_ids(
+            session, (name for record in unique.values() for name in record["artists"])
+        )
+        table = Track.__table__
+        insert = (
+            sqlite_insert(table)
+            .on_conflict_do_nothing(index_elements=["track_key"])
+            .returning(table.c.id, table.c.track_key)
+        )
+        checked_at = bindparam("checked_at", type_=DateTime())
+        merge = (
+            update(table)
+            .where(table.c.track_key == bindparam("key"))
+            .values(
+                uploaded=func.max(table.c.uploaded, bindparam("count")),
+                youtube_id=case(
+                    (table.c.dead, bindparam("video_id")), else_=table.c.youtube_id
+                ),
+                # the newer check of the same video is kept
+                validated_at=case(
+                    (table.c.dead, checked_at),
+                    (
+                        table.c.youtube_id == bindparam("video_id"),
+                        func.max(
+                            func.coalesce(table.c.validated_at, checked_at),
+                            func.coalesce(checked_at, table.c.validated_at),
+                        ),
+                    ),
+                    else_=table.c.validated_at,
+                ),
+                dead=False,
+            )
+        )
+        for chunk in chunked(list(unique.items())):
+            rows = []
+            for key, record in chunk:
+                match_title, match_artists = make_match_fields(
+                    record["title"], record["artists"]
+                )
+                rows.append(
+                    {
+                        "title": record["title"],
+                        "track_key": key,
+                        "youtube_id": record["youtube_id"],
+                        "uploaded": record.get("uploaded", 1),
+                        "validated_at": self._parse_datetime(
+                            record.get("validated_at")
+                        ),
+                        "match_title": match_title,
+                        "match_artists": match_artists,
+                    }
+                )
+            inserted = session.execute(insert, rows).all()
+            new_keys = {key for _, key in inserted}
+            associations = [
+                {"artist_id": artist_ids[name], "track_id": pk}
+                for pk, key in inserted
+                for name in unique[key]["artists"]
+            ]
+            if associations:
+                session.execute(association_table.insert(), associations)
+            merged = [
+                {
+                    "key": row["track_key"],
+                    "count": row["uploaded"],
+                    "video_id": row["youtube_id"],
+                    "checked_at": row["validated_at"],
+                }
+                for row in rows
+                if row["track_key"] not in new_keys
+            ]
+            if merged:
+                session.execute(merge, merged)
+            summary["inserted"] += len(inserted)
+            summary["merged"] += len(merged)
+        return summary
+
+    @staticmethod
+    def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+        return datetime.fromisoformat(value) if value else None
+
 
 class STdb:
-    def __init__(self, database: Database):
+    def __init__(
+        self,
+        database: Database,
+        artist_cache_size: int = 10000,
+        warm_artist_cache: bool = False,
+        fuzzy_threshold: Optional[float] = 0.85,
+        write_interval: Optional[float] = None,
+    ):
+        """
+        Args:
+            database (Database):                The database.
+            artist_cache_size (int):            Artist ids kept in memory.
+            warm_artist_cache (bool):           Load the most used artists at start.
+            fuzzy_threshold (Optional[float]):  See `TrackManager`.
+            write_interval (Optional[float]):   New tracks and upload counts are queued to a writer
+                                                thread that commits them every this many seconds,
+                                                None commits them at once.
+        """
         self.db = database
-        self.artist_manager = ArtistManager()
-        self.track_manager = TrackManager(self.artist_manager)
+        self.artist_manager = ArtistManager(artist_cache_size)
+        self.track_manager = TrackManager(self.artist_manager, fuzzy_threshold)
+        self.quota_manager = QuotaManager()
+        self.missing_manager = MissingTrackManager()
+        self.validation_manager = ValidationManager()
+        self.playlist_manager = PlaylistManager()
+        self.job_manager = TransferJobManager()
+        self.archive_manager = CacheArchiveManager(self.artist_manager)
+        if warm_artist_cache:
+            with self.db as session:
+                self.artist_manager.warm(session)
+        self.writer = (
+            BatchWriter(self._write_batch, interval=write_interval)
+            if write_interval is not None
+            else None
+        )
+
+    def _write_batch(
+        self, new_tracks: List[Tuple[SpotifyTrack, str]], pks: List[int]
+    ) -> None:
+        with self.db as session:
+            self.track_manager.add_tracks(session, new_tracks)
+            self.track_manager.update_uploads(session, pks)
+
+    def flush(self) -> None:
+        """
+        Wait until the queued writes are committed.
+        """
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
 
     def search_track(self, track: SpotifyTrack) -> Optional[Tuple[int, str]]:
         with self.db as session:
             return self.track_manager.search_track(session, track)
 
     def add_track(self, new_track: SpotifyTrack, youtube_id: str):
+        if self.writer is not None:
+            self.writer.add_track(new_track, youtube_id)
+            return
         with self.db as session:
             self.track_manager.add_track(session, new_track, youtube_id)
 
     def update_upload(self, pk: int) -> None:
+        if self.writer is not None:
+            self.writer.update_upload(pk)
+            return
         with self.db as session:
             self.track_manager.update_upload(session, pk)
 
+    def search_tracks(
+        self, tracks: Sequence[SpotifyTrack]
+    ) -> Dict[int, Tuple[int, str]]:
+        with self.db as session:
+            return self.track_manager.search_tracks(session, tracks)
+
+    def add_tracks(self, new_tracks: Iterable[Tuple[SpotifyTrack, str]]) -> None:
+        if self.writer is not None:
+            for new_track, youtube_id in new_tracks:
+                self.writer.add_track(new_track, youtube_id)
+            return
+        with self.db as session:
+            self.track_manager.add_tracks(session, new_tracks)
+
+    def update_uploads(self, pks: Iterable[int]) -> None:
+        if self.writer is not None:
+            for pk in pks:
+                self.writer.update_upload(pk)
+            return
+        with self.db as session:
+            self.track_manager.update_uploads(session, pks)
+
+    def export_tracks(self) -> Iterator[Dict[str, Any]]:
+        with self.db as session:
+            yield from self.archive_manager.export_tracks(session)
+
+    def import_tracks(self, records: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        with self.db as session:
+            return self.archive_manager.import_tracks(session, records)
+
+    def save_playlist(
+        self, spotify_playlist_id: str, playlist: SpotifyPlaylist
+    ) -> None:
+        with self.db as session:
+            self.playlist_manager.save_playlist(session, spotify_playlist_id, playlist)
+
+    def load_playlist(
+        self, spotify_playlist_id: str
+    ) -> Optional[Tuple[SpotifyPlaylist, Dict[int, Tuple[int, str]]]]:
+        with self.db as session:
+            return self.playlist_manager.load_playlist(session, spotify_playlist_id)
+
+    def get_unvalidated(
+        self, max_age_days: int = 30, limit: Optional[int] = None
+    ) -> List[Tuple[int, str]]:
+        with self.db as session:
+            return self.validation_manager.get_unvalidated(session, max_age_days, limit)
+
+    def mark_validated(self, alive: Iterable[int], dead: Iterable[int]) -> None:
+        with self.db as session:
+            self.validation_manager.mark_validated(session, alive, dead)
+
+    def search_missing(self, tracks: Sequence[SpotifyTrack]) -> Dict[int, str]:
+        with self.db as session:
+            return self.missing_manager.search_missing(session, tracks)
+
+    def add_missing(
+        self, misses: Iterable[Tuple[SpotifyTrack, str]], ttl_days: int = 30
+    ) -> None:
+        with self.db as session:
+            self.missing_manager.add_missing(session, misses, ttl_days)
+
+    def get_quota_usage(self, day: str) -> int:
+        with self.db as session:
+            return self.quota_manager.get_usage(session, day)
+
+    def add_quota_usage(self, day: str, units: int) -> None:
+        with self.db as session:
+            self.quota_manager.add_usage(session, day, units)
+
+    def reserve_quota(self, day: str, units: int, limit: int) -> bool:
+        with self.db as session:
+            return self.quota_manager.reserve_usage(session, day, units, limit)
+
+    def get_open_job(self, spotify_playlist_id: str) -> Optional[Tuple[int, str]]:
+        with self.db as session:
+            return self.job_manager.get_open_job(session, spotify_playlist_id)
+
+    def create_job(self, spotify_playlist_id: str, youtube_playlist_id: str) -> int:
+        with self.db as session:
+            return self.job_manager.create_job(
+                session, spotify_playlist_id, youtube_playlist_id
+            )
+
+    def get_last_job(
+        self, spotify_playlist_id: str
+    ) -> Optional[Tuple[int, str, Optional[str], str]]:
+        with self.db as session:
+            return self.job_manager.get_last_job(session, spotify_playlist_id)
+
+    def finish_job(self, job_id: int, snapshot_id: Optional[str] = None) -> None:
+        with self.db as session:
+            self.job_manager.finish_job(session, job_id, snapshot_id)
+
+    def inserted_keys(self, job_id: int) -> Counter:
+        with self.db as session:
+            return self.job_manager.inserted_keys(session, job_id)
+
+    def record_items(
+        self, job_id: int, items: Iterable[Tuple[int, str, Optional[str], str]]
+    ) -> None:
+        with self.db as session:
+            self.job_manager.record_items(session, job_id, items)
+
 
 if __name__ == "__main__":
     song1 = SpotifyTrack(
@@ -0,0 +1,228 @@
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection, Engine
+
+from src.database.models import TRACK_FTS_DDL
+from src.database.normalize import make_match_fields, make_track_key
+
+# the tables as the migrations see them, independent of the current models
+_track = sa.table(
+    "track_table",
+    sa.column("id"),
+    sa.column("title"),
+    sa.column("track_key"),
+    sa.column("match_title"),
+)
+_association = sa.table(
+    "association_table", sa.column("track_id"), sa.column("artist_id")
+)
+_artist = sa.table("artist_table", sa.column("id"), sa.column("name"))
+
+
+def _track_artists(
+    connection: Connection, unset_column: str
+) -> Tuple[Dict[int, str], Dict[int, List[str]]]:
+    """
+    Read the title and the artists of the tracks whose `unset_column` is still NULL.
+    """
+    query = (
+        sa.select(_track.c.id, _track.c.title, _artist.c.name)
+        .select_from(
+            _track.outerjoin(
+                _association, _association.c.track_id == _track.c.id
+            ).outerjoin(_artist, _artist.c.id == _association.c.artist_id)
+        )
+        .where(_track.c[unset_column].is_(None))
+        .order_by(_track.c.id)
+    )
+    rows = connection.execute(query)
+    titles: Dict[int, str] = {}
+    artists: Dict[int, List[str]] = defaultdict(list)
+    for track_id, title, artist in rows:
+        titles[track_id] = title
+        if artist is not None:
+            artists[track_id].append(artist)
+    return titles, artists
+
+
+def _columns(connection: Connection, table: str) -> List[str]:
+    return [column["name"] for column in sa.inspect(connection).get_columns(table)]
+
+
+def add_track_key(connection: Connection) -> None:
+    """
+    Add `track_table.track_key`, backfill it and put a unique index on it.
+    Tracks that end up with the same key are merged into the oldest one.
+    """
+    if "track_key" not in _columns(connection, "track_table"):
+        connection.execute(
+            sa.text("ALTER TABLE track_table ADD COLUMN track_key VARCHAR")
+        )
+
+    titles, artists = _track_artists(connection, "track_key")
+
+    existing = dict(
+        connection.execute(
+            sa.text("SELECT track_key, id FROM track_table WHERE track_key IS NOT NULL")
+        ).all()
+    )
+    for track_id, title in titles.items():
+        key = make_track_key(title, artists[track_id])
+        keeper = existing.get(key)
+        if keeper is None:
+            existing[key] = track_id
+            connection.execute(
+                sa.text("UPDATE track_table SET track_key = :key WHERE id = :id"),
+                {"key": key, "id": track_id},
+            )
+            continue
+        # duplicate of an older track: keep its upload count and drop it
+        connection.execute(
+            sa.text(
+                "UPDATE track_table SET uploaded = uploaded + "
+                "(SELECT uploaded FROM track_table WHERE id = :id) WHERE id = :keeper"
+            ),
+            {"id": track_id, "keeper": keeper},
+        )
+        connection.execute(
+            sa.text("DELETE FROM association_table WHERE track_id = :id"),
+            {"id": track_id},
+        )
+        connection.execute(
+            sa.text("DELETE FROM track_table WHERE id = :id"), {"id": track_id}
+        )
+
+    connection.execute(
+        sa.text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_track_table_track_key "
+            "ON track_table (track_key)"
+        )
+    )
+
+
+def unique_artist_name(connection: Connection) -> None:
+    """
+    Merge artists stored more than once under the same name and put a unique index on the name.
+    """
+    duplicates = connection.execute(
+        sa.text(
+            "SELECT name, MIN(id) FROM artist_table GROUP BY name HAVING COUNT(*) > 1"
+        )
+    ).all()
+    for name, keeper in duplicates:
+        params = {"name": name, "keeper": keeper}
+        connection.execute(
+            sa.text(
+                "UPDATE association_table SET artist_id = :keeper WHERE artist_id IN "
+                "(SELECT id FROM artist_table WHERE name = :name AND id != :keeper)"
+            ),
+            params,
+        )
+        connection.execute(
+            sa.text("DELETE FROM artist_table WHERE name = :name AND id != :keeper"),
+            params,
+        )
+
+    connection.execute(
+        sa.text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_artist_table_name "
+            "ON artist_table (name)"
+        )
+    )
+
+
+def add_job_snapshot_id(connection: Connection) -> None:
+    if "snapshot_id" not in _columns(connection, "transfer_job_table"):
+        connection.execute(
+            sa.text("ALTER TABLE transfer_job_table ADD COLUMN snapshot_id VARCHAR")
+        )
+
+
+def add_track_validation(connection: Connection) -> None:
+    columns = _columns(connection, "track_table")
+    if "validated_at" not in columns:
+        connection.execute(
+            sa.text("ALTER TABLE track_table ADD COLUMN validated_at DATETIME")
+        )
+    if "dead" not in columns:
+        connection.execute(
+            sa.text(
+                "ALTER TABLE track_table ADD COLUMN dead BOOLEAN NOT NULL DEFAULT 0"
+            )
+        )
+    connection.execute(
+        sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_track_table_validated_at "
+            "ON track_table (validated_at)"
+        )
+    )
+
+
+def add_fuzzy_index(connection: Connection) -> None:
+    """
+    Add the match columns of `track_table`, backfill them and build the trigram index over them.
+    The index and its triggers are created after the backfill, so it is built once from the content.
+    """
+    columns = _columns(connection, "track_table")
+    for column in ("match_title", "match_artists"):
+        if column not in columns:
+            connection.execute(
+                sa.text(f"ALTER TABLE track_table ADD COLUMN {column} VARCHAR")
+            )
+
+    titles, artists = _track_artists(connection, "match_title")
+    rows = []
+    for track_id, title in titles.items():
+        match_title, match_artists = make_match_fields(title, artists[track_id])
+        rows.append({"id": track_id, "title": match_title, "artists": match_artists})
+    if rows:
+        connection.execute(
+            sa.text(
+                "UPDATE track_table SET match_title = :title, match_artists = :artists "
+                "WHERE id = :id"
+            ),
+            rows,
+        )
+
+    connection.execute(
+        sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_track_table_match "
+            "ON track_table (match_title, match_artists)"
+        )
+    )
+    for statement in TRACK_FTS_DDL:
+        connection.execute(sa.text(statement))
+    connection.execute(sa.text("INSERT INTO track_fts(track_fts) VALUES ('rebuild')"))
+
+
+# applied in order, the position in the list is the schema version (PRAGMA user_version)
+MIGRATIONS: List[Callable[[Connection], None]] = [
+    add_track_key,
+    unique_artist_name,
+    add_job_snapshot_id,
+    add_track_validation,
+    add_fuzzy_index,
+]
+
+
+def migrate(engine: Engine, fresh: bool) -> None:
+    """
+    Upgrade an existing database file in place. A fresh database is created by `create_all` with the
+    current schema, so it is only stamped with the latest version.
+    Args:
+        engine (Engine):        The engine of the database.
+        fresh (bool):           True when the tables have just been created.
+    Returns:
+        None
+    """
+    with engine.begin() as connection:
+        if fresh:
+            version = len(MIGRATIONS)
+        else:
+            version = connection.execute(sa.text("PRAGMA user_version")).scalar()
+            for step in MIGRATIONS[version:]:
+                step(connection)
+                version += 1
+        connection.execute(sa.text(f"PRAGMA user_version = {int(version)}"))
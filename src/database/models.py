@@ -1,4 +1,5 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
 import sqlalchemy as sa
 from sqlalchemy.orm import Mapped, declarative_base, mapped_column, relationship
@@ -17,7 +18,7 @@ class Artist(Base):
     __tablename__ = "artist_table"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str]
+    name: Mapped[str] = mapped_column(unique=True, index=True)
     tracks: Mapped[List["Track"]] = relationship(
         "Track", secondary=association_table, back_populates="artists"
     )
@@ -28,14 +29,163 @@ class Artist(Base):
 
 class Track(Base):
     __tablename__ = "track_table"
+    __table_args__ = (sa.Index("ix_track_table_match", "match_title", "match_artists"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str]
+    # normalized title + sorted normalized artists, see `make_track_key`
+    track_key: Mapped[str] = mapped_column(unique=True, index=True)
     artists: Mapped[List["Artist"]] = relationship(
         "Artist", secondary=association_table, back_populates="tracks"
     )
     youtube_id: Mapped[str]
     uploaded: Mapped[int] = mapped_column(default=1)
+    # last check of the video with videos.list, dead videos are resolved again
+    validated_at: Mapped[Optional[datetime]] = mapped_column(index=True)
+    dead: Mapped[bool] = mapped_column(default=False, server_default=sa.false())
+    # simplified title and artists for the fuzzy lookup, see `make_match_fields`
+    match_title: Mapped[str]
+    match_artists: Mapped[str]
 
     def __repr__(self):
         return f"Track(id={self.id}, title={self.title})"
+
+
+# trigram index over the match columns, it finds the near duplicates of a title. The index only keeps
+# the trigrams (external content), the triggers keep it in sync with track_table.
+TRACK_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS track_fts USING fts5("
+    "match_title, match_artists, content='track_table', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS track_fts_insert AFTER INSERT ON track_table BEGIN "
+    "INSERT INTO track_fts(rowid, match_title, match_artists) "
+    "VALUES (new.id, new.match_title, new.match_artists); END",
+    "CREATE TRIGGER IF NOT EXISTS track_fts_delete AFTER DELETE ON track_table BEGIN "
+    "INSERT INTO track_fts(track_fts, rowid, match_title, match_artists) "
+    "VALUES ('delete', old.id, old.match_title, old.match_artists); END",
+    "CREATE TRIGGER IF NOT EXISTS track_fts_update AFTER UPDATE OF match_title, match_artists "
+    "ON track_table BEGIN "
+    "INSERT INTO track_fts(track_fts, rowid, match_title, match_artists) "
+    "VALUES ('delete', old.id, old.match_title, old.match_artists); "
+    "INSERT INTO track_fts(rowid, match_title, match_artists) "
+    "VALUES (new.id, new.match_title, new.match_artists); END",
+)
+for _statement in TRACK_FTS_DDL:
+    sa.event.listen(Track.__table__, "after_create", sa.DDL(_statement))
+
+
+class MissingTrack(Base):
+    """
+    Negative cache, tracks that couldn't be found on YouTube. They are skipped until `expires_at`.
+    """
+
+    __tablename__ = "missing_track_table"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    track_key: Mapped[str] = mapped_column(unique=True, index=True)
+    title: Mapped[str]
+    reason: Mapped[str]
+    created_at: Mapped[datetime] = mapped_column(server_default=sa.func.now())
+    expires_at: Mapped[datetime]
+
+    def __repr__(self):
+        return f"MissingTrack(id={self.id}, title={self.title}, reason={self.reason})"
+
+
+class PlaylistSnapshot(Base):
+    """
+    The last fetched version of a Spotify playlist, so that it can be transferred again without Spotify.
+    """
+
+    __tablename__ = "playlist_table"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    spotify_playlist_id: Mapped[str] = mapped_column(unique=True, index=True)
+    name: Mapped[str]
+    description: Mapped[str]
+    snapshot_id: Mapped[str]
+    track_count: Mapped[int]
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=sa.func.now(), onupdate=sa.func.now()
+    )
+    entries: Mapped[List["PlaylistEntry"]] = relationship(
+        back_populates="playlist", order_by="PlaylistEntry.position"
+    )
+
+    def __repr__(self):
+        return f"PlaylistSnapshot(id={self.id}, name={self.name}, snapshot_id={self.snapshot_id})"
+
+
+class PlaylistEntry(Base):
+    __tablename__ = "playlist_entry_table"
+
+    # artist names are joined into one column, the entry is read back as a whole
+    ARTIST_SEPARATOR = "\x1f"
+
+    playlist_id: Mapped[int] = mapped_column(
+        sa.ForeignKey("playlist_table.id"), primary_key=True
+    )
+    playlist: Mapped["PlaylistSnapshot"] = relationship(back_populates="entries")
+    position: Mapped[int] = mapped_column(primary_key=True)
+    title: Mapped[str]
+    artists: Mapped[str]
+    # joins the entry to its cached video in track_table
+    track_key: Mapped[str] = mapped_column(index=True)
+    spotify_id: Mapped[Optional[str]]
+    duration_ms: Mapped[Optional[int]]
+
+    def __repr__(self):
+        return f"PlaylistEntry(playlist_id={self.playlist_id}, position={self.position}, title={self.title})"
+
+
+class QuotaUsage(Base):
+    __tablename__ = "quota_usage_table"
+
+    # the quota day in Pacific Time, YYYY-MM-DD
+    day: Mapped[str] = mapped_column(primary_key=True)
+    units: Mapped[int] = mapped_column(default=0)
+
+    def __repr__(self):
+        return f"QuotaUsage(day={self.day}, units={self.units})"
+
+
+class TransferJob(Base):
+    __tablename__ = "transfer_job_table"
+
+    RUNNING = "running"
+    DONE = "done"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    spotify_playlist_id: Mapped[str] = mapped_column(index=True)
+    youtube_playlist_id: Mapped[str]
+    # Spotify snapshot of the playlist when it was last synchronized
+    snapshot_id: Mapped[Optional[str]]
+    status: Mapped[str] = mapped_column(default=RUNNING)
+    created_at: Mapped[datetime] = mapped_column(server_default=sa.func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=sa.func.now(), onupdate=sa.func.now()
+    )
+    items: Mapped[List["TransferItem"]] = relationship(back_populates="job")
+
+    def __repr__(self):
+        return f"TransferJob(id={self.id}, spotify_playlist_id={self.spotify_playlist_id}, status={self.status})"
+
+
+class TransferItem(Base):
+    __tablename__ = "transfer_item_table"
+    __table_args__ = (sa.UniqueConstraint("job_id", "position"),)
+
+    RESOLVED = "resolved"
+    INSERTED = "inserted"
+    FAILED = "failed"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    job_id: Mapped[int] = mapped_column(sa.ForeignKey("transfer_job_table.id"))
+    job: Mapped["TransferJob"] = relationship(back_populates="items")
+    # position of the track in the Spotify playlist
+    position: Mapped[int]
+    track_key: Mapped[str]
+    youtube_id: Mapped[Optional[str]]
+    state: Mapped[str]
+
+    def __repr__(self):
+        return f"TransferItem(job_id={self.job_id}, position={self.position}, state={self.state})"
@@ -0,0 +1,73 @@
+import re
+import unicodedata
+from typing import Iterable, List, Tuple
+
+# control characters can't appear in titles, so they can't collide with the content
+TITLE_SEPARATOR = "\x1f"
+ARTIST_SEPARATOR = "\x1e"
+# separates the artists of the fuzzy match columns, punctuation is removed from the names
+MATCH_ARTIST_SEPARATOR = "; "
+
+# parts of a title that name a release of the same recording, not a different song
+_RELEASE_WORDS = (
+    r"remaster(?:ed)?|radio edit|single version|album version|original mix|mono|stereo|"
+    r"bonus track|explicit|clean|deluxe(?: edition)?"
+)
+_FEATURE_WORDS = r"feat\.?|ft\.?|featuring"
+# (feat. X), [Remastered 2011], (2011 Remaster)
+_BRACKETED = re.compile(
+    rf"[\(\[][^\)\]]*\b(?:{_FEATURE_WORDS}|{_RELEASE_WORDS})(?:\b|\s)[^\)\]]*[\)\]]"
+)
+# Song - Remastered 2011, Song - 2011 Remaster, Song - Radio Edit
+_SUFFIX = re.compile(rf"\s+-\s+[^-]*\b(?:{_RELEASE_WORDS})\b.*$")
+# Song feat. X
+_TRAILING_FEATURE = re.compile(rf"\s+(?:{_FEATURE_WORDS})\s.*$")
+_PUNCTUATION = re.compile(r"[^\w\s]|_")
+# Don't and Dont are the same word
+_APOSTROPHES = re.compile(r"['\u2019`]")
+
+
+def normalize(text: str) -> str:
+    """
+    Canonical form of a title or a name: NFKC, case folded and with collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def make_track_key(title: str, artists: Iterable[str]) -> str:
+    """
+    Build the cache key of a track: the normalized title followed by the sorted, normalized artists.
+    The order of artists doesn't matter but repeated artists do, like the multiset compared before.
+    """
+    names = ARTIST_SEPARATOR.join(sorted(normalize(artist) for artist in artists))
+    return f"{normalize(title)}{TITLE_SEPARATOR}{names}"
+
+
+def _fold(text: str) -> str:
+    # NFKD splits accented letters, the combining marks are dropped
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def simplify_title(title: str) -> str:
+    """
+    Loose form of a title used by the fuzzy lookup: accents, case, punctuation, featured artists and
+    remaster or edit notes are removed. Live versions, remixes and such are kept, they are other recordings.
+    """
+    text = _APOSTROPHES.sub("", _fold(title))
+    text = _BRACKETED.sub(" ", text)
+    text = _SUFFIX.sub("", text)
+    text = _TRAILING_FEATURE.sub("", text)
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def simplify_artist(name: str) -> str:
+    return " ".join(_PUNCTUATION.sub(" ", _APOSTROPHES.sub("", _fold(name))).split())
+
+
+def make_match_fields(title: str, artists: Iterable[str]) -> Tuple[str, str]:
+    """
+    Build the fuzzy match columns of a track: the simplified title and the sorted simplified artists.
+    """
+    names: List[str] = sorted(filter(None, map(simplify_artist, artists)))
+    return simplify_title(title), MATCH_ARTIST_SEPARATOR.join(names)
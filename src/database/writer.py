@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from src.spotify.models import Track as SpotifyTrack
+
+# (tracks to add, pks whose upload counter is increased), written in one transaction
+WriteBatch = Callable[[List[Tuple[SpotifyTrack, str]], List[int]], None]
+
+_TRACK = "track"
+_UPLOAD = "upload"
+_FLUSH = "flush"
+_STOP = "stop"
+
+
+class BatchWriter:
+    """
+    The only thread writing new tracks and upload counts. Callers queue the writes and return at once,
+    the writer commits what was queued every `interval` seconds or `max_batch` writes, so parallel
+    workers don't wait for the database lock nor pay a commit per row.
+    """
+
+    def __init__(self, write: WriteBatch, interval: float = 1.0, max_batch: int = 500):
+        """
+        Args:
+            write (WriteBatch):         Writes one batch, called from the writer thread only.
+            interval (float):           Seconds the writer collects writes before a commit.
+            max_batch (int):            Writes that are committed at once without waiting.
+        """
+        self.write = write
+        self.interval = interval
+        self.max_batch = max_batch
+        self.batches = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def add_track(self, track: SpotifyTrack, youtube_id: str) -> None:
+        self._put(_TRACK, (track, youtube_id))
+
+    def update_upload(self, pk: int) -> None:
+        self._put(_UPLOAD, pk)
+
+    def _put(self, kind: str, value) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The writer is closed.")
+            self._queue.put((kind, value))
+
+    def _collect(self) -> List[Tuple[str, object]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_batch and batch[-1][0] in (_TRACK, _UPLOAD):
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            tracks = [value for kind, value in batch if kind == _TRACK]
+            uploads = [value for kind, value in batch if kind == _UPLOAD]
+            if tracks or uploads:
+                try:
+                    self.write(tracks, uploads)
+                    self.batches += 1
+                except Exception as e:
+                    # the batch is lost, the error reaches the caller of the next flush
+                    self._error = e
+            for kind, value in batch:
+                if kind == _FLUSH:
+                    value.set()
+            if batch[-1][0] == _STOP:
+                return
+
+    def flush(self) -> None:
+        """
+        Wait until every write queued so far is committed.
+        Raises:
+            Exception:                  The error of a batch that failed since the last flush.
+        """
+        done = threading.Event()
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._queue.put((_FLUSH, done))
+        if closed:
+            # the writer stops after the queued writes, nothing would answer the flush
+            self._thread.join()
+        else:
+            done.wait()
+        self._raise()
+
+    def _raise(self) -> None:
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """
+        Commit the queued writes and stop the thread.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put((_STOP, None))
+        self._thread.join()
+        self._raise()
@@ -2,6 +2,7 @@ import os
 
 from dotenv import load_dotenv
 
+from src import metrics
 from src.database.connection import Database, STdb
 from src.spot_tube import SpotTube
 
@@ -10,11 +11,52 @@ load_dotenv()
 CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 YT_CREDENTIAL_FILE_NAME = os.getenv("YT_CREDENTIAL_FILE_NAME")
+WEBDRIVER_POOL_SIZE = int(os.getenv("WEBDRIVER_POOL_SIZE", 2))
+YT_TOKEN_FILE = os.getenv("YT_TOKEN_FILE", ".youtube_token.json")
+WEBDRIVER_LEAN = os.getenv("WEBDRIVER_LEAN", "1").lower() in ("1", "true", "yes")
+SPOTIFY_PAGE_CONCURRENCY = int(os.getenv("SPOTIFY_PAGE_CONCURRENCY", 4))
+SPOTIFY_TOKEN_CACHE = os.getenv("SPOTIFY_TOKEN_CACHE", ".spotify_token.json")
+YT_DAILY_QUOTA = int(os.getenv("YT_DAILY_QUOTA", 10000))
+YT_QUOTA_POLICY = os.getenv("YT_QUOTA_POLICY", "refuse")
+MISSING_TRACK_TTL_DAYS = int(os.getenv("MISSING_TRACK_TTL_DAYS", 30))
+YT_SEARCH_QUOTA = int(os.getenv("YT_SEARCH_QUOTA", 0))
+METRICS = os.getenv("METRICS", "").lower() in ("1", "true", "yes")
+METRICS_FILE = os.getenv("METRICS_FILE")
+# seconds the new tracks are collected before a commit, 0 commits them at once
+DB_WRITE_INTERVAL = float(os.getenv("DB_WRITE_INTERVAL", 1.0)) or None
+# 0 turns the fuzzy lookup off
+FUZZY_MATCH_THRESHOLD = float(os.getenv("FUZZY_MATCH_THRESHOLD", 0.85)) or None
+
+
+def create_app(interactive_auth: bool = True) -> SpotTube:
+    if METRICS or METRICS_FILE:
+        metrics.enable()
+    return SpotTube(
+        CLIENT_ID,
+        CLIENT_SECRET,
+        YT_CREDENTIAL_FILE_NAME,
+        STdb(
+            Database(),
+            fuzzy_threshold=FUZZY_MATCH_THRESHOLD,
+            write_interval=DB_WRITE_INTERVAL,
+        ),
+        driver_pool_size=WEBDRIVER_POOL_SIZE,
+        spotify_page_concurrency=SPOTIFY_PAGE_CONCURRENCY,
+        spotify_token_cache=SPOTIFY_TOKEN_CACHE,
+        daily_quota=YT_DAILY_QUOTA,
+        quota_policy=YT_QUOTA_POLICY,
+        missing_ttl_days=MISSING_TRACK_TTL_DAYS,
+        search_quota=YT_SEARCH_QUOTA,
+        metrics_file=METRICS_FILE,
+        lean_scraping=WEBDRIVER_LEAN,
+        youtube_token_file=YT_TOKEN_FILE,
+        youtube_interactive_auth=interactive_auth,
+    )
 
 
 def main():
-    st = SpotTube(CLIENT_ID, CLIENT_SECRET, YT_CREDENTIAL_FILE_NAME, STdb(Database()))
-    st.run()
+    with create_app() as st:
+        st.run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Metrics:
+    """
+    Collects the duration of every stage and event counters. Samples are kept in memory, one float
+    per timed call, which is fine for the size of a playlist.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples.clear()
+            self.counters.clear()
+
+    @staticmethod
+    def percentile(samples: List[float], q: float) -> float:
+        # nearest rank on the sorted samples
+        ordered = sorted(samples)
+        rank = max(math.ceil(q * len(ordered)), 1)
+        return ordered[rank - 1]
+
+    def summary(self, tracks: int = 0, elapsed: float = 0.0) -> Dict[str, Any]:
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+            counters = dict(self.counters)
+        stages = {
+            stage: {
+                "count": len(values),
+                "total": sum(values),
+                "p50": self.percentile(values, 0.5),
+                "p95": self.percentile(values, 0.95),
+            }
+            for stage, values in sorted(samples.items())
+        }
+        return {
+            "tracks": tracks,
+            "elapsed": elapsed,
+            "tracks_per_second": tracks / elapsed if elapsed > 0 else 0.0,
+            "stages": stages,
+            "counters": dict(sorted(counters.items())),
+        }
+
+    def report(self, tracks: int = 0, elapsed: float = 0.0) -> str:
+        summary = self.summary(tracks, elapsed)
+        lines = [
+            f"{tracks} tracks in {elapsed:.2f}s ({summary['tracks_per_second']:.2f} tracks/s)"
+        ]
+        for stage, stats in summary["stages"].items():
+            lines.append(
+                f"\t{stage}: {stats['count']} calls, p50 {stats['p50'] * 1000:.1f}ms, "
+                f"p95 {stats['p95'] * 1000:.1f}ms, total {stats['total']:.2f}s"
+            )
+        for name, value in summary["counters"].items():
+            lines.append(f"\t{name}: {value}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def to_prometheus(summary: Dict[str, Any]) -> str:
+        lines = [
+            "# HELP spottube_stage_seconds Duration of the transfer stages.",
+            "# TYPE spottube_stage_seconds summary",
+        ]
+        for stage, stats in summary["stages"].items():
+            for key, quantile in (("p50", "0.5"), ("p95", "0.95")):
+                lines.append(
+                    f'spottube_stage_seconds{{stage="{stage}",quantile="{quantile}"}} '
+                    f"{stats[key]}"
+                )
+            lines.append(
+                f'spottube_stage_seconds_sum{{stage="{stage}"}} {stats["total"]}'
+            )
+            lines.append(
+                f'spottube_stage_seconds_count{{stage="{stage}"}} {stats["count"]}'
+            )
+        lines += [
+            "# HELP spottube_events_total Cache hits, misses and other events.",
+            "# TYPE spottube_events_total counter",
+        ]
+        for name, value in summary["counters"].items():
+            lines.append(f'spottube_events_total{{name="{name}"}} {value}')
+        lines += [
+            "# HELP spottube_tracks_per_second Throughput of the last transfer.",
+            "# TYPE spottube_tracks_per_second gauge",
+            f"spottube_tracks_per_second {summary['tracks_per_second']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, tracks: int = 0, elapsed: float = 0.0) -> None:
+        """
+        Write the summary to `path`, in the Prometheus text format when the file ends with .prom
+        (for the node exporter textfile collector), JSON otherwise.
+        """
+        summary = self.summary(tracks, elapsed)
+        if path.endswith(".prom"):
+            content = self.to_prometheus(summary)
+        else:
+            content = json.dumps(summary, indent=2)
+        # the collector may read the file at any time, so it is replaced atomically
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+
+class NullMetrics:
+    """
+    Stand-in used while instrumentation is off, every call returns right away.
+    """
+
+    enabled = False
+    _context = nullcontext()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        pass
+
+    def timer(self, stage: str) -> nullcontext:
+        return self._context
+
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+    def reset(self) -> None:
+        pass
+
+
+_recorder = NullMetrics()
+
+
+def enable() -> Metrics:
+    global _recorder
+    if not _recorder.enabled:
+        _recorder = Metrics()
+    return _recorder
+
+
+def disable() -> None:
+    global _recorder
+    _recorder = NullMetrics()
+
+
+def get() -> Optional[Metrics]:
+    """
+    Returns the active recorder, None while instrumentation is off.
+    """
+    return _recorder if _recorder.enabled else None
+
+
+def timer(stage: str):
+    return _recorder.timer(stage)
+
+
+def observe(stage: str, seconds: float) -> None:
+    _recorder.observe(stage, seconds)
+
+
+def count(name: str, value: int = 1) -> None:
+    _recorder.count(name, value)
@@ -0,0 +1,38 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Deque, Iterable, Iterator, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def ordered_map(
+    func: Callable[[T], R], items: Iterable[T], workers: int, buffer: int
+) -> Iterator[Tuple[T, "Future[R]"]]:
+    """
+    Run `func` concurrently over `items` and yield (item, future) pairs in the input order.
+    At most `buffer` items are in flight, so the input is pulled lazily and memory stays flat
+    no matter how long the input is.
+    Args:
+        func (Callable):            The function executed in the worker threads.
+        items (Iterable):           The input, consumed lazily from the calling thread.
+        workers (int):              The number of worker threads.
+        buffer (int):               The maximum number of items in flight.
+    Returns:
+        Iterator[Tuple[T, Future]]: The item and its finished or running future.
+    """
+    iterator = iter(items)
+    pending: Deque[Tuple[T, Future]] = deque()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for item in islice(iterator, max(buffer, 1)):
+            pending.append((item, executor.submit(func, item)))
+        while pending:
+            item, future = pending.popleft()
+            for next_item in islice(iterator, 1):
+                pending.append((next_item, executor.submit(func, next_item)))
+            yield item, future
+    finally:
+        # the consumer may stop early, don't start work nobody will read
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -1,19 +1,43 @@
+import time
 from abc import ABC, abstractmethod
-from typing import Dict
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import wraps
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from googleapiclient.errors import HttpError
-from pyfiglet import Figlet
 
+from src import metrics
 from src.database.connection import STdb
-from src.spotify.api import Spotify, SpotifyException
-from src.youtube.api import Youtube
+from src.database.models import TransferItem, TransferJob
+from src.database.normalize import make_track_key
+from src.pipeline import ordered_map
+from src.spotify.api import Spotify, SpotifyApiError, SpotifyException
+from src.spotify.models import Playlist, Track
+from src.youtube.api import PlayListItems, QuotaPlan, QuotaTracker, Videos, Youtube
+from src.youtube.exception import ResolverError, VideoNotFoundException
 
-# from src.youtube.exception import ExceedQuotaException
+# position in the playlist, the track and its cache entry (id, youtube_id)
+Lookup = Tuple[int, Track, Optional[Tuple[int, str]]]
+
+
+@dataclass
+class TransferReport:
+    playlist_id: str
+    name: str = ""
+    inserted: int = 0
+    failed: int = 0
+    ok: bool = False
+    # tracks that couldn't be resolved, with the reason
+    skipped: List[str] = field(default_factory=list)
 
 
 def welcome_screen(app_name):
     def inner(func):
         def wrapper(*args, **kwargs):
+            from pyfiglet import Figlet
+
             print("*" * 100)
             f = Figlet(font="slant")
             text = f.renderText(app_name)
@@ -29,6 +53,29 @@ def welcome_screen(app_name):
     return inner
 
 
+def measured(func):
+    """
+    Print the stage timings of a transfer when instrumentation is on. Nested calls (an update that
+    falls back to a transfer) are measured once.
+    """
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        recorder = metrics.get()
+        if recorder is None or self._measuring:
+            return func(self, *args, **kwargs)
+        recorder.reset()
+        self._measuring = True
+        start = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self._measuring = False
+            self.report_metrics(recorder, time.perf_counter() - start)
+
+    return wrapper
+
+
 class ConsoleApp(ABC):
     def __init__(self, options: Dict[str, str]):
         """
@@ -59,84 +106,573 @@ class ConsoleApp(ABC):
 
 
 class SpotTube(ConsoleApp):
+    # tracks looked up in the cache per query
+    LOOKUP_CHUNK_SIZE = 100
+    # cache writes buffered before they are committed in one transaction
+    WRITE_BATCH_SIZE = 50
+    # cached videos checked per round, 50 videos.list requests of 50 ids
+    VALIDATE_CHUNK_SIZE = 2500
+    # refuse: don't start a transfer that doesn't fit today's quota
+    # split: transfer what fits today, the rest after the quota resets
+    QUOTA_POLICIES = ("refuse", "split")
+    # a reservation only fails when another run took the units, the plan is made again
+    RESERVE_ATTEMPTS = 5
+
     def __init__(
         self,
         client_id: str,
         client_secret: str,
         credential_file_name: str,
         database: STdb,
+        driver_pool_size: int = 2,
+        resolver_workers: Optional[int] = None,
+        spotify_page_concurrency: int = 4,
+        spotify_token_cache: Optional[str] = None,
+        daily_quota: int = 10000,
+        quota_policy: str = "refuse",
+        missing_ttl_days: int = 30,
+        search_quota: int = 0,
+        metrics_file: Optional[str] = None,
+        lean_scraping: bool = True,
+        youtube_token_file: Optional[str] = None,
+        youtube_interactive_auth: bool = True,
     ):
         super(SpotTube, self).__init__(
-            {"transfer": "Transfer playlist from Spotify to YouTube"}
+            {
+                "transfer": "Transfer playlist from Spotify to YouTube",
+                "update": "Add new tracks of a transferred playlist to YouTube",
+                "load": "Transfer playlist from the local snapshot",
+            }
         )
         try:
             self.check_options()
         except AttributeError as e:
             raise Exception(f"Please implement method: {e.name}") from e
-        self.spotify = Spotify(client_id, client_secret)
-        self.youtube = Youtube(credential_file_name)
+        self.spotify = Spotify(
+            client_id,
+            client_secret,
+            page_concurrency=spotify_page_concurrency,
+            token_cache_file=spotify_token_cache,
+        )
         self.db = database
+        self.quota = QuotaTracker(database, daily_limit=daily_quota)
+        if quota_policy not in self.QUOTA_POLICIES:
+            raise ValueError(f"Unsupported quota policy: {quota_policy}")
+        self.quota_policy = quota_policy
+        # quota units the resolver may spend on API searches, kept out of the transfer plans
+        self.search_quota = search_quota
+        self.youtube = Youtube(
+            credential_file_name,
+            driver_pool_size=driver_pool_size,
+            quota=self.quota,
+            search_quota=search_quota,
+            lean_scraping=lean_scraping,
+            token_file=youtube_token_file,
+            interactive_auth=youtube_interactive_auth,
+        )
+        # one resolver per warm driver keeps every browser busy without queueing on the pool
+        self.resolver_workers = resolver_workers or driver_pool_size
+        # tracks that couldn't be found are not searched again for this many days
+        self.missing_ttl_days = missing_ttl_days
+        # outcome of the last transfer or update
+        self.report: Optional[TransferReport] = None
+        # JSON, or Prometheus text format for a .prom file, written after every transfer
+        self.metrics_file = metrics_file
+        self._measuring = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Shut down every browser started by the webdriver pool and commit the queued database writes.
+        """
+        report = self.youtube.report()
+        if report:
+            print(report)
+        self.youtube.close()
+        self.db.close()
+
+    def _pending(
+        self, playlist: Iterable[Track], done: Counter
+    ) -> Iterator[Tuple[int, Track]]:
+        # tracks inserted by an earlier run are matched by key, so a reordered playlist still resumes
+        for position, track in enumerate(playlist):
+            key = make_track_key(track.title, track.extract_artists())
+            if done[key] > 0:
+                done[key] -= 1
+                continue
+            yield position, track
+
+    def _lookup(
+        self,
+        tracks: Iterable[Tuple[int, Track]],
+        known: Optional[Dict[int, Tuple[int, str]]] = None,
+    ) -> Iterator[Lookup]:
+        """
+        Pair the tracks with their cache entries. `known` maps positions to cache entries already read
+        with a stored playlist, only the other positions are looked up.
+        """
+        iterator = iter(tracks)
+        while chunk := list(islice(iterator, self.LOOKUP_CHUNK_SIZE)):
+            with metrics.timer("db.lookup"):
+                if known is None:
+                    found = self.db.search_tracks([track for _, track in chunk])
+                else:
+                    found = {
+                        index: known[position]
+                        for index, (position, _) in enumerate(chunk)
+                        if position in known
+                    }
+                    # tracks stored without a video may have been cached since, also under another spelling
+                    rest = [index for index in range(len(chunk)) if index not in found]
+                    if rest:
+                        cached = self.db.search_tracks([chunk[i][1] for i in rest])
+                        found.update({rest[i]: entry for i, entry in cached.items()})
+                unknown = [index for index in range(len(chunk)) if index not in found]
+                missing = self.db.search_missing([chunk[index][1] for index in unknown])
+            missing = {unknown[index]: reason for index, reason in missing.items()}
+            metrics.count("cache.hit", len(found))
+            metrics.count("cache.miss", len(unknown) - len(missing))
+            metrics.count("cache.known_missing", len(missing))
+            for index, (position, track) in enumerate(chunk):
+                if index in missing:
+                    self._skip(track, f"{missing[index]} (cached)")
+                    continue
+                yield position, track, found.get(index)
+
+    def _skip(self, track: Track, reason: str) -> None:
+        self.report.skipped.append(f"{track}: {reason}")
+        print(f"Skipping track '{track}': {reason}")
+
+    def _flush(
+        self,
+        new_tracks: List[Tuple[Track, str]],
+        uploaded: List[int],
+        misses: List[Tuple[Track, str]],
+    ) -> None:
+        with metrics.timer("db.write"):
+            self._write(new_tracks, uploaded, misses)
+
+    def _write(
+        self,
+        new_tracks: List[Tuple[Track, str]],
+        uploaded: List[int],
+        misses: List[Tuple[Track, str]],
+    ) -> None:
+        if misses:
+            self.db.add_missing(misses, self.missing_ttl_days)
+            misses.clear()
+        if new_tracks:
+            self.db.add_tracks(new_tracks)
+            new_tracks.clear()
+        if uploaded:
+            self.db.update_uploads(uploaded)
+            uploaded.clear()
+
+    def _resolve(self, lookup: Lookup) -> str:
+        _, track, search_result = lookup
+        if search_result:
+            return search_result[1]
+        return self.youtube.search_video_by_web_scraping(track)
+
+    def validate_cache(
+        self,
+        max_age_days: int = 30,
+        limit: Optional[int] = None,
+        region: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """
+        Check the cached videos that weren't validated within `max_age_days`, 1 quota unit per 50 videos.
+        Dead videos are marked so that their tracks are resolved again. It stops when the quota runs out,
+        the next run continues with the videos left.
+        Returns:
+            Dict[str, int]:             The number of checked, dead and not yet checked videos.
+        """
+        tracks = self.db.get_unvalidated(max_age_days, limit)
+        summary = {"checked": 0, "dead": 0, "left": len(tracks)}
+        for start in range(0, len(tracks), self.VALIDATE_CHUNK_SIZE):
+            chunk = tracks[start : start + self.VALIDATE_CHUNK_SIZE]
+            pks_by_video: Dict[str, List[int]] = {}
+            for pk, youtube_id in chunk:
+                pks_by_video.setdefault(youtube_id, []).append(pk)
+            cost = self.quota.cost(
+                "videos.list", -(-len(pks_by_video) // Videos.IDS_PER_REQUEST)
+            )
+            if cost > self.quota.remaining:
+                print("The quota is used up, run the validation again after it resets.")
+                break
+
+            playable = self.youtube.check_videos(list(pks_by_video), region)
+            alive = [
+                pk for video, ok in playable.items() if ok for pk in pks_by_video[video]
+            ]
+            dead = [
+                pk
+                for video, ok in playable.items()
+                if not ok
+                for pk in pks_by_video[video]
+            ]
+            self.db.mark_validated(alive, dead)
+            summary["checked"] += len(alive) + len(dead)
+            summary["dead"] += len(dead)
+            summary["left"] -= len(alive) + len(dead)
+        print(
+            f"Validated {summary['checked']} cached tracks, {summary['dead']} videos are gone."
+        )
+        return summary
+
+    def plan_quota(
+        self, playlist: Playlist, done: int = 0, new_playlist: bool = True
+    ) -> QuotaPlan:
+        # cache misses are scraped, API searches are paid from the reserved search budget
+        return self.quota.plan(
+            max(playlist.songs - done, 0),
+            new_playlist=new_playlist,
+            reserved=self.search_quota,
+        )
+
+    def _quota_limit(
+        self, make_plan: Callable[[], QuotaPlan]
+    ) -> Tuple[QuotaPlan, Optional[int]]:
+        """
+        Apply the quota policy to the plan and reserve the units of the tracks transferred now, so
+        parallel runs can't plan with the same units. Returns the plan and the number of tracks to
+        transfer now, None when refused.
+        """
+        for _ in range(self.RESERVE_ATTEMPTS):
+            plan = make_plan()
+            limit = self._apply_quota_policy(plan)
+            if limit is None or self.quota.reserve(plan.units(limit)):
+                return plan, limit
+            # another run reserved units since the plan was made
+        print("Parallel transfers use up the quota, try again later.")
+        return plan, None
+
+    def _apply_quota_policy(self, plan: QuotaPlan) -> Optional[int]:
+        if plan.fits:
+            return plan.track_count
+        print(
+            f"The transfer needs ~{plan.cost} quota units, {plan.remaining} are left today. "
+            f"{plan.tracks_today} of {plan.track_count} tracks fit."
+        )
+        if self.quota_policy == "refuse" or plan.tracks_today == 0:
+            print("Transfer refused, try again after the quota resets.")
+            return None
+        print("The remaining tracks can be transferred after the quota resets.")
+        return plan.tracks_today
 
+    def _insert_tracks(
+        self, job_id: int, id_playlist: str, lookups: Iterable[Lookup]
+    ) -> bool:
+        """
+        Resolve the tracks and insert them into the YouTube playlist in order, recording every track in the job.
+        Returns False when YouTube stopped the transfer.
+        """
+        # stages: fetch + db lookup (this thread) -> resolve (workers) -> insert (this thread, in order)
+        resolved = ordered_map(
+            self._resolve,
+            lookups,
+            workers=self.resolver_workers,
+            buffer=2 * self.resolver_workers,
+        )
+        new_tracks: List[Tuple[Track, str]] = []
+        uploaded: List[int] = []
+        misses: List[Tuple[Track, str]] = []
+        try:
+            for (position, track, search_result), future in resolved:
+                key = make_track_key(track.title, track.extract_artists())
+                try:
+                    youtube_id = future.result()
+                except VideoNotFoundException as e:
+                    # remembered, so later runs skip the track without searching
+                    reason = str(e) or "video not found"
+                    misses.append((track, reason))
+                    self.db.record_items(
+                        job_id, [(position, key, None, TransferItem.FAILED)]
+                    )
+                    self._skip(track, reason)
+                    continue
+                except ResolverError as e:
+                    # the search itself failed, the track is tried again next run
+                    self._skip(track, f"search failed: {e}")
+                    continue
+                if not search_result:
+                    new_tracks.append((track, youtube_id))
+
+                try:
+                    status_insert = self.youtube.add_track_to_playlist(
+                        id_playlist, youtube_id
+                    )
+                except HttpError as e:
+                    self.report.failed += 1
+                    self.db.record_items(
+                        job_id, [(position, key, youtube_id, TransferItem.RESOLVED)]
+                    )
+                    print(f"Failed to add track '{track}' to playlist: {e}")
+                    print("Run the transfer again to continue where it stopped.")
+                    return False
+
+                if not status_insert:
+                    self.report.failed += 1
+                state = TransferItem.INSERTED if status_insert else TransferItem.FAILED
+                self.db.record_items(job_id, [(position, key, youtube_id, state)])
+                if status_insert:
+                    self.report.inserted += 1
+                    print(f"Track '{track}' has been added to playlist. ")
+                    if search_result:
+                        uploaded.append(search_result[0])
+
+                if (
+                    len(new_tracks) + len(uploaded) + len(misses)
+                    >= self.WRITE_BATCH_SIZE
+                ):
+                    self._flush(new_tracks, uploaded, misses)
+        finally:
+            self._flush(new_tracks, uploaded, misses)
+            # a finished transfer is in the cache, also when the writes go through the writer thread
+            with metrics.timer("db.write"):
+                self.db.flush()
+        return True
+
+    def print_skipped(self) -> None:
+        if not self.report.skipped:
+            return
+        print(f"{len(self.report.skipped)} tracks were skipped:")
+        for skipped in self.report.skipped:
+            print(f"\t{skipped}")
+
+    def report_metrics(self, recorder: metrics.Metrics, elapsed: float) -> None:
+        tracks = self.report.inserted if self.report else 0
+        print(recorder.report(tracks, elapsed))
+        if self.metrics_file:
+            recorder.write(self.metrics_file, tracks, elapsed)
+
+    @measured
     def do_transfer(self, id_spotify_playlist) -> bool:
+        self.report = TransferReport(id_spotify_playlist)
         # capture id of playlist
         try:
-            playlist = self.spotify.capture_playlist(id_spotify_playlist)
+            with metrics.timer("spotify.capture"):
+                playlist = self.spotify.capture_playlist(id_spotify_playlist)
         except SpotifyException:
             print(
                 "Invalid ID of spotify playlist. Please check id of playlist and try again."
             )
             return False
+        except SpotifyApiError as e:
+            print(f"Failed to read the Spotify playlist: {e}")
+            return False
+        self.report.name = playlist.name
+        try:
+            transferred = self._transfer(id_spotify_playlist, playlist)
+        except (SpotifyException, SpotifyApiError) as e:
+            # the pages are read while the tracks are inserted, the job keeps what was done
+            print(f"Failed to read the Spotify playlist: {e}")
+            print("Run the transfer again to continue where it stopped.")
+            return False
+        # only after the transfer read the playlist without errors, a partial one mustn't be stored
+        self._save_snapshot(id_spotify_playlist, playlist)
+        return transferred
 
-        id_playlist = self.youtube.create_playlist(playlist)
-        if not id_playlist:
-            print("Failed to create playlist on YouTube.")
+    def _save_snapshot(self, id_spotify_playlist: str, playlist: Playlist) -> None:
+        # the pages not read by the transfer are fetched now, option 3 needs the whole playlist
+        try:
+            self.db.save_playlist(id_spotify_playlist, playlist)
+        except (SpotifyException, SpotifyApiError) as e:
+            print(f"The playlist couldn't be stored locally: {e}")
+
+    def _transfer(
+        self,
+        id_spotify_playlist: str,
+        playlist: Playlist,
+        known: Optional[Dict[int, Tuple[int, str]]] = None,
+    ) -> bool:
+        # an unfinished transfer of the playlist continues where it stopped
+        job = self.db.get_open_job(id_spotify_playlist)
+        done = self.db.inserted_keys(job[0]) if job else Counter()
+
+        plan, limit = self._quota_limit(
+            lambda: self.plan_quota(playlist, sum(done.values()), new_playlist=not job)
+        )
+        if limit is None:
             return False
 
-        for track in playlist.items:
-            # 1st search on db
-            search_result = self.db.search_track(track)
-            if not search_result:
-                youtube_id = self.youtube.search_video_by_web_scraping(track)
-                self.db.add_track(track, youtube_id)
+        try:
+            if job:
+                job_id, id_playlist = job
+                print(
+                    f"Resuming the transfer, {sum(done.values())} tracks are already on YouTube."
+                )
             else:
-                track_id, youtube_id = search_result
+                id_playlist = self.youtube.create_playlist(playlist)
+                if not id_playlist:
+                    print("Failed to create playlist on YouTube.")
+                    return False
+                job_id = self.db.create_job(id_spotify_playlist, id_playlist)
 
-            try:
-                status_insert = self.youtube.add_track_to_playlist(
-                    id_playlist, youtube_id
-                )
-            except HttpError as e:
-                print(f"Failed to add track '{track}' to playlist: {e}")
+            lookups = self._lookup(islice(self._pending(playlist, done), limit), known)
+            if not self._insert_tracks(job_id, id_playlist, lookups):
                 return False
 
-            if status_insert:
-                print(f"Track '{track}' has been added to playlist. ")
-                if search_result:
-                    self.db.update_upload(track_id)
+            if limit < plan.track_count:
+                print(
+                    f"Transferred {limit} of {plan.track_count} tracks of {playlist.name}."
+                )
+                self.print_skipped()
+                self.report.ok = True
+                return True
+
+            self.db.finish_job(job_id, playlist.snapshot_id)
+            print(
+                f"Playlist {playlist.name} has been successfully transferred to YouTube."
+            )
+            self.print_skipped()
+            self.report.ok = True
+            return True
+        finally:
+            # the units reserved for tracks that weren't inserted are free again
+            self.quota.release()
+
+    @measured
+    def do_update(self, id_spotify_playlist) -> bool:
+        """
+        Insert only the tracks added to the Spotify playlist since it was transferred. An unchanged playlist
+        costs one Spotify request and no YouTube quota, a changed one also the pages of the YouTube playlist.
+        """
+        self.report = TransferReport(id_spotify_playlist)
+        job = self.db.get_last_job(id_spotify_playlist)
+        if not job:
+            print("The playlist hasn't been transferred yet, transfer it first.")
+            return False
+        job_id, id_playlist, last_snapshot, status = job
+        if status != TransferJob.DONE:
+            return self.do_transfer(id_spotify_playlist)
+
+        try:
+            snapshot_id = self.spotify.get_snapshot_id(id_spotify_playlist)
+        except SpotifyException:
+            print(
+                "Invalid ID of spotify playlist. Please check id of playlist and try again."
+            )
+            return False
+        except SpotifyApiError as e:
+            print(f"Failed to read the Spotify playlist: {e}")
+            return False
+        if snapshot_id and snapshot_id == last_snapshot:
+            print("The playlist is up to date.")
+            self.report.ok = True
+            return True
 
-        print(f"Playlist {playlist.name} has been successfully transferred to YouTube.")
+        try:
+            with metrics.timer("spotify.capture"):
+                playlist = self.spotify.capture_playlist(id_spotify_playlist)
+        except SpotifyException:
+            print(
+                "Invalid ID of spotify playlist. Please check id of playlist and try again."
+            )
+            return False
+        except SpotifyApiError as e:
+            print(f"Failed to read the Spotify playlist: {e}")
+            return False
+        self.report.name = playlist.name
+
+        # the YouTube playlist is read before the inserts are planned, its pages are reserved first
+        pages = max(-(-playlist.songs // PlayListItems.PAGE_SIZE), 1)
+        if not self.quota.reserve(self.quota.cost("playlistItems.list", pages)):
+            print("The quota is used up, run the update again after it resets.")
+            return False
+        try:
+            return self._update(job_id, id_playlist, id_spotify_playlist, playlist)
+        except (SpotifyException, SpotifyApiError) as e:
+            print(f"Failed to read the Spotify playlist: {e}")
+            return False
+        finally:
+            self.quota.release()
+
+    def _update(
+        self,
+        job_id: int,
+        id_playlist: str,
+        id_spotify_playlist: str,
+        playlist: Playlist,
+    ) -> bool:
+        try:
+            on_youtube = Counter(self.youtube.get_playlist_video_ids(id_playlist))
+        except HttpError as e:
+            print(f"Failed to read the YouTube playlist: {e}")
+            return False
+
+        # cached tracks whose video is already in the playlist are skipped, the rest is new
+        added = []
+        for position, track, search_result in self._lookup(enumerate(playlist)):
+            if search_result and on_youtube[search_result[1]] > 0:
+                on_youtube[search_result[1]] -= 1
+                continue
+            added.append((position, track, search_result))
+        self._save_snapshot(id_spotify_playlist, playlist)
+
+        _, limit = self._quota_limit(
+            lambda: self.quota.plan(
+                len(added), new_playlist=False, reserved=self.search_quota
+            )
+        )
+        if limit is None:
+            return False
+        if not self._insert_tracks(job_id, id_playlist, added[:limit]):
+            return False
+
+        if limit == len(added):
+            self.db.finish_job(job_id, playlist.snapshot_id)
+        print(f"Added {limit} new tracks to playlist {playlist.name}.")
+        self.print_skipped()
+        self.report.ok = True
         return True
 
+    @measured
+    def do_load(self, id_spotify_playlist) -> bool:
+        """
+        Transfer the playlist stored by an earlier transfer or update, the tracks and their cached videos
+        come from the database. Spotify is only asked whether the stored version is still current.
+        """
+        self.report = TransferReport(id_spotify_playlist)
+        stored = self.db.load_playlist(id_spotify_playlist)
+        if stored is None:
+            print("The playlist isn't stored locally, transfer it from Spotify first.")
+            return False
+        playlist, known = stored
+
+        try:
+            snapshot_id = self.spotify.get_snapshot_id(id_spotify_playlist)
+        except (SpotifyException, SpotifyApiError):
+            print("Spotify can't be reached, the stored playlist is used.")
+            snapshot_id = None
+        if snapshot_id and snapshot_id != playlist.snapshot_id:
+            print("The playlist changed on Spotify, the new version is fetched.")
+            return self.do_transfer(id_spotify_playlist)
+
+        self.report.name = playlist.name
+        return self._transfer(id_spotify_playlist, playlist, known)
+
     def menu(self, option: str) -> bool:
         try:
             option = int(option)
         except ValueError:
             print("Invalid option. Please enter a number.")
             return False
+        if not 1 <= option <= len(self.options):
+            print("Please choose correct options")
+            return False
         funct_prefix = list(self.options.keys())[option - 1]
         opt_func = getattr(self, f"do_{funct_prefix}")
 
         match option:
-            case 1:
+            case 1 | 2 | 3:
                 id_playlist = input("Tab spotify id playlist: ")
                 return opt_func(id_playlist)
-            case 2:
-                # TODO: update song to playlist
-                print("We are working for this options.")
-            case 3:
-                # TODO: load playlist for database
-                print("We are working for this options.")
-
             case _:
                 print("Please choose correct options")
 
@@ -1,8 +1,15 @@
+import random
+import time
 from http import HTTPStatus
+from typing import Any, Dict, Iterator, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from .. import metrics
+from ..pipeline import ordered_map
 from .models import Artist, Playlist, Track
+from .token import TokenManager
 
 
 class SpotifyException(Exception):
@@ -13,54 +20,181 @@ class SpotifyException(Exception):
         self.message = message
 
 
+class SpotifyApiError(Exception):
+    """Raised when Spotify can't be read, the playlist itself may be fine"""
+
+
 class Spotify:
-    TOKEN_URL = "https://accounts.spotify.com/api/token"  # nosec
     PLAYLIST_URL = "https://api.spotify.com/v1/playlists/"  # nosec
+    PAGE_SIZE = 100
+    # only the fields that are parsed, see https://developer.spotify.com/documentation/web-api/reference/get-playlist
+    ITEM_FIELDS = "items(track(id,name,duration_ms,artists(name)))"
+    PLAYLIST_FIELDS = f"name,description,snapshot_id,tracks(total,next,{ITEM_FIELDS})"
+    PAGE_FIELDS = f"next,{ITEM_FIELDS}"
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    MAX_RETRIES = 5
+    BASE_DELAY = 1.0
+    MAX_DELAY = 32.0
 
-    def __init__(self, client_id, client_secret):
+    def __init__(
+        self,
+        client_id,
+        client_secret,
+        page_concurrency: int = 4,
+        token_cache_file: Optional[str] = None,
+    ):
         self.client_id = client_id
         self.client_secret = client_secret
-        self.access_token = self.get_access_token()
-
-    def get_access_token(self):
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-        }
-
-        response = requests.post(self.TOKEN_URL, data=data, timeout=60)
-        if response.status_code == HTTPStatus.OK:
-            return response.json()["access_token"]
-        elif response.status_code in [
-            HTTPStatus.UNAUTHORIZED,
-            HTTPStatus.FORBIDDEN,
-            HTTPStatus.TOO_MANY_REQUESTS,
-        ]:
-            raise Exception("Authorization error: {}".format(response.status_code))
-        else:
-            raise Exception("An error occurred: {}".format(response.status_code))
-
-    def capture_playlist(self, playlist_id: str) -> Playlist:
-        # create headers
-        headers = {"Authorization": "Bearer {}".format(self.access_token)}
-        request = requests.get(
-            self.PLAYLIST_URL + f"{playlist_id}", headers=headers, timeout=60
+        self.page_concurrency = max(page_concurrency, 1)
+        # the token is requested on the first API call, or reused from the cache file
+        self.token_manager = TokenManager(client_id, client_secret, token_cache_file)
+        # keep-alive connections for the page requests
+        self.session = requests.Session()
+        self.session.mount(
+            "https://", HTTPAdapter(pool_maxsize=max(self.page_concurrency, 10))
         )
 
-        response = request.json()
+    def get_access_token(self) -> str:
+        return self.token_manager.get()
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> None:
+        # the rate limiter tells how long to wait, otherwise full jitter as for YouTube
+        try:
+            delay = min(float(retry_after), self.MAX_DELAY)
+        except (TypeError, ValueError):
+            delay = random.uniform(
+                0, min(self.MAX_DELAY, self.BASE_DELAY * 2**attempt)
+            )
+        time.sleep(delay)
+
+    def _get(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Request the url, refreshing a rejected token once and retrying rate limits, server errors
+        and network errors with backoff.
+        Raises:
+            SpotifyException:           The playlist doesn't exist.
+            SpotifyApiError:            Spotify couldn't be read, also after the retries.
+        """
+        refreshed = False
+        attempt = 0
+        while True:
+            token = self.token_manager.get()
+            headers = {"Authorization": "Bearer {}".format(token)}
+            try:
+                with metrics.timer("spotify.request"):
+                    request = self.session.get(
+                        url, headers=headers, params=params, timeout=60
+                    )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.MAX_RETRIES:
+                    raise SpotifyApiError(f"Spotify can't be reached: {e}") from e
+                metrics.count("spotify.retry")
+                self.backoff(attempt)
+                attempt += 1
+                continue
+            # the token was revoked or expired early, refresh it once
+            if request.status_code == HTTPStatus.UNAUTHORIZED and not refreshed:
+                refreshed = True
+                self.token_manager.invalidate(token)
+                continue
+            if request.status_code in self.RETRY_STATUSES:
+                if attempt == self.MAX_RETRIES:
+                    raise SpotifyApiError(
+                        f"Spotify answered {request.status_code} after {attempt + 1} attempts."
+                    )
+                metrics.count("spotify.retry")
+                self.backoff(attempt, request.headers.get("Retry-After"))
+                attempt += 1
+                continue
+            break
+
+        try:
+            response = request.json()
+        except ValueError as e:
+            raise SpotifyApiError(f"Spotify sent an invalid response: {e}") from e
         # check if response has status error
         if response.get("error"):
-            raise SpotifyException("The ID of the playlist is incorrect.")
+            if request.status_code in (HTTPStatus.BAD_REQUEST, HTTPStatus.NOT_FOUND):
+                raise SpotifyException("The ID of the playlist is incorrect.")
+            raise SpotifyApiError(f"Spotify refused the request: {response['error']}")
+        return response
 
+    @staticmethod
+    def parse_tracks(items: List[Dict[str, Any]]) -> List[Track]:
         tracks = []
-        for item in response["tracks"]["items"]:
-            title = item["track"]["name"]
-            artists = [Artist(artist["name"]) for artist in item["track"]["artists"]]
-            tracks.append(Track(title, artists))
+        for item in items:
+            track = item.get("track")
+            # removed and unavailable tracks come back as null
+            if not track:
+                continue
+            artists = [Artist(artist["name"]) for artist in track["artists"]]
+            tracks.append(
+                Track(
+                    track["name"],
+                    artists,
+                    spotify_id=track.get("id"),
+                    duration_ms=track.get("duration_ms"),
+                )
+            )
+        return tracks
+
+    def fetch_page(self, playlist_id: str, offset: int) -> Dict[str, Any]:
+        return self._get(
+            self.PLAYLIST_URL + f"{playlist_id}/tracks",
+            {"fields": self.PAGE_FIELDS, "limit": self.PAGE_SIZE, "offset": offset},
+        )
+
+    def stream_tracks(
+        self, playlist_id: str, first_page: Dict[str, Any]
+    ) -> Iterator[Track]:
+        """
+        Yield the tracks of the playlist in order. When the first page tells the total, the remaining
+        pages are fetched concurrently (`page_concurrency` at a time), otherwise `next` links are followed.
+        Pages are requested only as the stream is consumed.
+        """
+        yield from self.parse_tracks(first_page["items"])
+        if not first_page.get("next"):
+            return
+
+        offset = len(first_page["items"])
+        total = first_page.get("total")
+        if total is not None:
+            pages = ordered_map(
+                lambda page_offset: self.fetch_page(playlist_id, page_offset),
+                range(offset, total, self.PAGE_SIZE),
+                workers=self.page_concurrency,
+                buffer=2 * self.page_concurrency,
+            )
+            for _, future in pages:
+                yield from self.parse_tracks(future.result()["items"])
+            return
+
+        while True:
+            page = self.fetch_page(playlist_id, offset)
+            yield from self.parse_tracks(page["items"])
+            if not page.get("next"):
+                return
+            offset += len(page["items"])
+
+    def get_snapshot_id(self, playlist_id: str) -> str:
+        """
+        Cheap check whether the playlist changed, the snapshot id changes with every edit.
+        """
+        response = self._get(
+            self.PLAYLIST_URL + f"{playlist_id}", {"fields": "snapshot_id"}
+        )
+        return response.get("snapshot_id", "")
+
+    def capture_playlist(self, playlist_id: str) -> Playlist:
+        response = self._get(
+            self.PLAYLIST_URL + f"{playlist_id}", {"fields": self.PLAYLIST_FIELDS}
+        )
+        first_page = response["tracks"]
 
         return Playlist(
             name=response.get("name", ""),
             description=response.get("description", ""),
-            items=tracks,
+            snapshot_id=response.get("snapshot_id", ""),
+            total=first_page.get("total"),
+            stream=self.stream_tracks(playlist_id, first_page),
         )
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
 
 
 @dataclass
@@ -11,6 +11,8 @@ class Artist:
 class Track:
     title: str
     artists: List[Artist]
+    spotify_id: Optional[str] = None
+    duration_ms: Optional[int] = None
 
     def __str__(self):
         return f"{self.title} by {', '.join(artist.name for artist in self.artists)}"
@@ -23,8 +25,41 @@ class Track:
 class Playlist:
     name: str
     description: str
-    items: List[Track]
+    items: List[Track] = field(default_factory=list)
+    snapshot_id: str = ""
+    total: Optional[int] = None
+    # tracks not fetched yet, they are pulled page by page while the playlist is iterated
+    stream: Optional[Iterator[Track]] = field(default=None, repr=False, compare=False)
+    # why the stream stopped early, a failed stream must not pass for the whole playlist
+    error: Optional[Exception] = field(default=None, repr=False, compare=False)
+
+    def __iter__(self) -> Iterator[Track]:
+        yield from self.items
+        if self.error is not None:
+            raise self.error
+        while self.stream is not None:
+            try:
+                track = next(self.stream)
+            except StopIteration:
+                self.stream = None
+                return
+            except Exception as e:
+                self.stream = None
+                self.error = e
+                raise
+            self.items.append(track)
+            yield track
+
+    def load(self) -> List[Track]:
+        """
+        Fetch every remaining track.
+        Raises:
+            Exception:                  The error that stopped the stream, also when it failed before.
+        """
+        for _ in self:
+            pass
+        return self.items
 
     @property
     def songs(self) -> int:
-        return len(self.items)
+        return self.total if self.total is not None else len(self.items)
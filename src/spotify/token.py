@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+import time
+from http import HTTPStatus
+from typing import Optional
+
+import requests
+
+
+class TokenManager:
+    """
+    Caches the client credentials token in memory and on disk, so short runs reuse the token of the
+    previous process and long runs refresh it `leeway` seconds before it expires.
+    """
+
+    TOKEN_URL = "https://accounts.spotify.com/api/token"  # nosec
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        cache_file: Optional[str] = None,
+        leeway: int = 60,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.cache_file = cache_file
+        self.leeway = leeway
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self.token is not None and time.time() < self.expires_at - self.leeway
+
+    def request_token(self) -> None:
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+        }
+
+        response = requests.post(self.TOKEN_URL, data=data, timeout=60)
+        if response.status_code == HTTPStatus.OK:
+            payload = response.json()
+            self.token = payload["access_token"]
+            self.expires_at = time.time() + payload.get("expires_in", 3600)
+        elif response.status_code in [
+            HTTPStatus.UNAUTHORIZED,
+            HTTPStatus.FORBIDDEN,
+            HTTPStatus.TOO_MANY_REQUESTS,
+        ]:
+            raise Exception("Authorization error: {}".format(response.status_code))
+        else:
+            raise Exception("An error occurred: {}".format(response.status_code))
+
+    def _load(self) -> None:
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, encoding="utf-8") as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return
+        # the file may hold the token of another app
+        if cached.get("client_id") == self.client_id:
+            self.token = cached.get("access_token")
+            self.expires_at = float(cached.get("expires_at", 0))
+
+    def _discard(self, token: str) -> None:
+        # remove the file only while it holds the rejected token, another process may have refreshed it
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, encoding="utf-8") as file:
+                cached = json.load(file)
+            if cached.get("access_token") == token:
+                os.remove(self.cache_file)
+        except (OSError, ValueError):
+            pass
+
+    def _save(self) -> None:
+        if not self.cache_file:
+            return
+        cached = {
+            "client_id": self.client_id,
+            "access_token": self.token,
+            "expires_at": self.expires_at,
+        }
+        # write to a temporary file and swap, so other processes never read a half written file
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(cached, file)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            pass
+
+    def get(self) -> str:
+        """
+        Return a token valid for at least `leeway` seconds, it is requested only when needed.
+        """
+        with self._lock:
+            if not self._is_fresh():
+                self._load()
+            if not self._is_fresh():
+                self.request_token()
+                self._save()
+            return self.token
+
+    def invalidate(self, token: str) -> None:
+        """
+        Drop a token rejected by the API, also from the cache file. Other requests that already got
+        a new token are not affected.
+        """
+        with self._lock:
+            if self.token == token:
+                self.token = None
+                self.expires_at = 0.0
+            self._discard(token)
@@ -1,34 +1,141 @@
+import random
+import socket
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from zoneinfo import ZoneInfo
 
-import google_auth_oauthlib.flow as google_auth
-import googleapiclient.discovery as google_client
 from googleapiclient.errors import HttpError
 
-from src.youtube.exception import ExceedQuotaException
-from src.youtube.search import YTSearch
+from src import metrics
+from src.youtube.exception import ExceedQuotaException, VideoNotFoundException
+from src.youtube.resolver import (
+    AdaptiveResolver,
+    ApiResolver,
+    HttpResolver,
+    Resolver,
+    SeleniumResolver,
+)
 
-from ..spotify.models import Playlist
+from ..spotify.models import Playlist, Track
 
 
-class YouTubeOperation(ABC):
-    @abstractmethod
-    def insert(self, *args, **kwargs):
-        pass
+class ApiOperation:
+    """
+    Runs API requests with retries and in batches, and charges their quota cost.
+    """
+
+    quota: Optional["QuotaTracker"] = None
+    # statuses worth another try, 409 is returned when concurrent writes to a playlist collide
+    RETRY_STATUSES = {409, 429, 500, 502, 503, 504}
+    RETRY_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "backendError"}
+    MAX_RETRIES = 5
+    BASE_DELAY = 1.0
+    MAX_DELAY = 32.0
+    # requests per batch HTTP call
+    BATCH_SIZE = 50
+
+    def charge(self, operation: str, count: int = 1) -> None:
+        if self.quota:
+            self.quota.charge(operation, count)
+
+    @classmethod
+    def is_transient(cls, error: Exception) -> bool:
+        if isinstance(error, HttpError):
+            if error.resp.status in cls.RETRY_STATUSES:
+                return True
+            details = (
+                error.error_details if isinstance(error.error_details, list) else []
+            )
+            reasons = {
+                detail.get("reason") for detail in details if isinstance(detail, dict)
+            }
+            return bool(reasons & cls.RETRY_REASONS)
+        return isinstance(error, (ConnectionError, TimeoutError, socket.timeout))
+
+    def backoff(self, attempt: int) -> None:
+        # full jitter, see https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+        time.sleep(
+            random.uniform(0, min(self.MAX_DELAY, self.BASE_DELAY * 2**attempt))
+        )
 
-    def execute(self, request) -> Optional[Dict[str, Any]]:
+    def execute_with_retry(self, request, operation: str) -> Dict[str, Any]:
+        """
+        Execute the request, retrying transient errors with jittered exponential backoff.
+        Every attempt is charged, YouTube counts failed requests too.
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.charge(operation)
+            try:
+                return request.execute()
+            except Exception as e:
+                if attempt == self.MAX_RETRIES or not self.is_transient(e):
+                    raise
+            metrics.count(f"youtube.retry.{operation}")
+            self.backoff(attempt)
+
+    def execute(self, request, operation: str) -> Optional[Dict[str, Any]]:
         try:
-            response = request.execute()
+            response = self.execute_with_retry(request, operation)
         except HttpError:
             return None
         return response
 
+    def execute_batch(
+        self, requests: List[Any], operation: str
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Execute independent requests through batch HTTP calls, up to `BATCH_SIZE` per round trip.
+        Requests that fail transiently are retried in the next batch.
+        Returns:
+            List[Optional[Dict[str, Any]]]: The responses in the order of requests, None for failed requests.
+        """
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        pending = list(range(len(requests)))
+        for attempt in range(self.MAX_RETRIES + 1):
+            retry = []
+            for start in range(0, len(pending), self.BATCH_SIZE):
+                chunk = pending[start : start + self.BATCH_SIZE]
+                errors: Dict[int, Exception] = {}
+
+                def callback(request_id, response, exception):
+                    index = int(request_id)
+                    if exception is not None:
+                        errors[index] = exception
+                    else:
+                        responses[index] = response
+
+                batch = self.youtube.new_batch_http_request(callback=callback)
+                for index in chunk:
+                    batch.add(requests[index], request_id=str(index))
+                self.charge(operation, len(chunk))
+                batch.execute()
+                retry.extend(
+                    index for index, error in errors.items() if self.is_transient(error)
+                )
+            if not retry or attempt == self.MAX_RETRIES:
+                break
+            pending = sorted(retry)
+            self.backoff(attempt)
+        return responses
+
+
+class YouTubeOperation(ApiOperation, ABC):
+    @abstractmethod
+    def insert(self, *args, **kwargs):
+        pass
+
 
 class Playlists(YouTubeOperation):
     INSERT_QUOTA_COST = 50
 
-    def __init__(self, client):
+    def __init__(self, client, quota: Optional["QuotaTracker"] = None):
         self.youtube = client
+        self.quota = quota
         self.part = "snippet,status"
         self.id = None
 
@@ -45,7 +152,7 @@ class Playlists(YouTubeOperation):
         }
         request = self.youtube.playlists().insert(part=self.part, body=body)
 
-        response = self.execute(request)
+        response = self.execute(request, "playlists.insert")
         # if response is successful, it will set id
         if response:
             self.id = response.get("id")
@@ -54,52 +161,409 @@ class Playlists(YouTubeOperation):
 
 
 class PlayListItems(YouTubeOperation):
-    def __init__(self, client):
+    INSERT_QUOTA_COST = 50
+    # items per playlistItems.list request
+    PAGE_SIZE = 50
+
+    def __init__(self, client, quota: Optional["QuotaTracker"] = None):
         self.youtube = client
+        self.quota = quota
         self.part = "snippet"
 
-    def insert(self, playlist_id, video_id):
-        body = {
-            "snippet": {
-                "playlistId": playlist_id,
-                "position": 0,
-                "resourceId": {"kind": "youtube#video", "videoId": video_id},
-            }
+    def insert(self, playlist_id, video_id, position: Optional[int] = None):
+        """
+        Insert the video at `position`, or append it to the end of the playlist when position is None.
+        """
+        snippet = {
+            "playlistId": playlist_id,
+            "resourceId": {"kind": "youtube#video", "videoId": video_id},
         }
-        request = self.youtube.playlistItems().insert(part=self.part, body=body)
-        response = request.execute()
+        if position is not None:
+            snippet["position"] = position
+        request = self.youtube.playlistItems().insert(
+            part=self.part, body={"snippet": snippet}
+        )
+        with metrics.timer("youtube.insert"):
+            response = self.execute_with_retry(request, "playlistItems.insert")
 
         return response
 
+    def list_video_ids(self, playlist_id: str) -> Iterator[str]:
+        """
+        Yield the video ids of the playlist, `PAGE_SIZE` per request (1 quota unit each).
+        """
+        page_token = None
+        while True:
+            request = self.youtube.playlistItems().list(
+                part="contentDetails",
+                playlistId=playlist_id,
+                maxResults=self.PAGE_SIZE,
+                pageToken=page_token,
+            )
+            response = self.execute_with_retry(request, "playlistItems.list")
+            for item in response.get("items", []):
+                yield item["contentDetails"]["videoId"]
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return
+
+
+class Videos(ApiOperation):
+    # ids per videos.list request, the request costs 1 unit however many ids it has
+    IDS_PER_REQUEST = 50
+    DEAD_UPLOAD_STATUSES = {"deleted", "failed", "rejected"}
+
+    def __init__(self, client, quota: Optional["QuotaTracker"] = None):
+        self.youtube = client
+        self.quota = quota
+        self.part = "status,contentDetails"
+
+    @classmethod
+    def is_playable(cls, item: Dict[str, Any], region: Optional[str] = None) -> bool:
+        status = item.get("status", {})
+        if status.get("uploadStatus") in cls.DEAD_UPLOAD_STATUSES:
+            return False
+        if status.get("privacyStatus") == "private":
+            return False
+        restriction = item.get("contentDetails", {}).get("regionRestriction", {})
+        if region and region in restriction.get("blocked", []):
+            return False
+        if region and "allowed" in restriction and region not in restriction["allowed"]:
+            return False
+        return True
+
+    def check(
+        self, video_ids: List[str], region: Optional[str] = None
+    ) -> Dict[str, bool]:
+        """
+        Check whether the videos can still be played, 50 ids per videos.list request, the requests are
+        sent through batch HTTP calls.
+        Args:
+            video_ids (List[str]):      The ids to check.
+            region (str):               ISO 3166-1 code of the region the videos must be available in.
+        Returns:
+            Dict[str, bool]:            Maps every checked id to whether it is playable. Ids of failed
+                                        requests are left out, they are checked next time.
+        """
+        unique = list(dict.fromkeys(video_ids))
+        chunks = [
+            unique[start : start + self.IDS_PER_REQUEST]
+            for start in range(0, len(unique), self.IDS_PER_REQUEST)
+        ]
+        requests = [
+            self.youtube.videos().list(
+                part=self.part, id=",".join(chunk), maxResults=self.IDS_PER_REQUEST
+            )
+            for chunk in chunks
+        ]
+        result: Dict[str, bool] = {}
+        for chunk, response in zip(chunks, self.execute_batch(requests, "videos.list")):
+            if response is None:
+                continue
+            # videos that were deleted are missing from the response
+            items = {item["id"]: item for item in response.get("items", [])}
+            for video_id in chunk:
+                item = items.get(video_id)
+                result[video_id] = item is not None and self.is_playable(item, region)
+        return result
+
+
+class Search(ApiOperation):
+    QUOTA_COST = 100
+
+    def __init__(self, client, quota: Optional["QuotaTracker"] = None):
+        self.youtube = client
+        self.quota = quota
+
+    def video_id(self, query: str) -> Optional[str]:
+        """
+        Return the id of the first video found for the query, None when nothing is found.
+        """
+        request = self.youtube.search().list(
+            part="id", q=query, type="video", maxResults=1
+        )
+        response = self.execute_with_retry(request, "search.list")
+        for item in response.get("items", []):
+            return item["id"]["videoId"]
+        return None
+
+
+@dataclass
+class QuotaPlan:
+    cost: int
+    remaining: int
+    track_count: int
+    # how many tracks can be transferred before the quota runs out
+    tracks_today: int
+    setup: int = 0
+    per_track: int = 0
+
+    @property
+    def fits(self) -> bool:
+        return self.cost <= self.remaining
+
+    def units(self, tracks: int) -> int:
+        return self.setup + self.per_track * tracks
+
+
+class QuotaTracker:
+    """
+    Keeps the running total of quota units spent today. The total is stored through `storage`
+    (STdb) so that every run on the machine shares it. The quota resets at midnight Pacific Time.
+    """
+
+    COSTS = {
+        "playlists.insert": Playlists.INSERT_QUOTA_COST,
+        "playlistItems.insert": PlayListItems.INSERT_QUOTA_COST,
+        "playlistItems.list": 1,
+        "videos.list": 1,
+        "search.list": Search.QUOTA_COST,
+    }
+    TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+    def __init__(self, storage=None, daily_limit: int = 10000):
+        self.storage = storage
+        self.daily_limit = daily_limit
+        self._usage: Dict[str, int] = {}
+        # units reserved by this process and not charged yet, per day
+        self._held: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def today(self) -> str:
+        return datetime.now(self.TIMEZONE).date().isoformat()
+
+    def cost(self, operation: str, count: int = 1) -> int:
+        return self.COSTS[operation] * count
+
+    def charge(self, operation: str, count: int = 1) -> None:
+        units = self.cost(operation, count)
+        day = self.today()
+        with self._lock:
+            # reserved units are in the total already
+            held = min(self._held.get(day, 0), units)
+            if held:
+                self._held[day] -= held
+                units -= held
+            if units:
+                self._add(day, units)
+
+    def _add(self, day: str, units: int) -> None:
+        if self.storage:
+            self.storage.add_quota_usage(day, units)
+        else:
+            self._usage[day] = self._usage.get(day, 0) + units
+
+    def reserve(self, units: int) -> bool:
+        """
+        Count the units as used before they are spent, so parallel runs can't plan with the same units.
+        The check and the booking are one statement in the database. Charges are taken from the
+        reservation first, `release` returns what wasn't spent.
+        Returns:
+            bool:                       False when the units are no longer left today.
+        """
+        if units <= 0:
+            return True
+        day = self.today()
+        with self._lock:
+            if self.storage:
+                reserved = self.storage.reserve_quota(day, units, self.daily_limit)
+            else:
+                reserved = self._usage.get(day, 0) + units <= self.daily_limit
+                if reserved:
+                    self._add(day, units)
+            if reserved:
+                self._held[day] = self._held.get(day, 0) + units
+        return reserved
+
+    def release(self) -> None:
+        with self._lock:
+            held, self._held = self._held, {}
+            for day, units in held.items():
+                if units:
+                    self._add(day, -units)
+
+    @property
+    def used(self) -> int:
+        day = self.today()
+        if self.storage:
+            return self.storage.get_quota_usage(day)
+        return self._usage.get(day, 0)
+
+    @property
+    def remaining(self) -> int:
+        return max(self.daily_limit - self.used, 0)
+
+    def plan(
+        self,
+        track_count: int,
+        new_playlist: bool = True,
+        reserved: int = 0,
+    ) -> QuotaPlan:
+        """
+        Estimate the cost of a transfer before it starts.
+        Args:
+            track_count (int):          The number of tracks to insert.
+            new_playlist (bool):        Whether a playlist has to be created.
+            reserved (int):             Units kept aside for other work, e.g. the search budget.
+        Returns:
+            QuotaPlan:                  The estimated cost and how many tracks fit into today's quota.
+        """
+        per_track = self.cost("playlistItems.insert")
+        setup = self.cost("playlists.insert") if new_playlist else 0
+        remaining = max(self.remaining - reserved, 0)
+        tracks_today = min(max((remaining - setup) // per_track, 0), track_count)
+        return QuotaPlan(
+            cost=setup + per_track * track_count,
+            remaining=remaining,
+            track_count=track_count,
+            tracks_today=tracks_today,
+            setup=setup,
+            per_track=per_track,
+        )
+
 
 class Youtube:
     API_SERVICE_NAME = "youtube"
     API_VERSION = "v3"
     SCOPE = ["https://www.googleapis.com/auth/youtube.force-ssl"]
 
-    def __init__(self, client_secret_file):
+    def __init__(
+        self,
+        client_secret_file,
+        webdriver: str = "Chrome",
+        driver_pool_size: int = 2,
+        quota: Optional[QuotaTracker] = None,
+        search_quota: int = 0,
+        lean_scraping: bool = True,
+        token_file: Optional[str] = None,
+        interactive_auth: bool = True,
+    ):
+        """
+        The API client, the browsers and the resolvers are built on first use, so work that needs
+        neither doesn't pay for the OAuth flow or the selenium import.
+        Args:
+            search_quota (int):     Quota units that may be spent on search.list in this run.
+            lean_scraping (bool):   Browsers skip images and media and read all results in one script.
+            token_file (str):       Where the OAuth credentials are kept between runs.
+            interactive_auth (bool):    False never opens the browser consent, the credentials must
+                                        be in `token_file` already.
+        """
         self.secret_file = client_secret_file
-        self.youtube = self._build_google_api_client()
+        self.token_file = token_file
+        self.interactive_auth = interactive_auth
+        self.webdriver = webdriver
+        self.driver_pool_size = driver_pool_size
+        self.lean_scraping = lean_scraping
+        self.search_quota = search_quota
+        self.quota = quota or QuotaTracker()
+        self._parts: Dict[str, Any] = {}
+        # resolver workers may ask for the same part at once, the resolver needs the driver pool
+        self._lock = threading.RLock()
 
-        self.playlist = Playlists(self.youtube)
-        self.playlist_items = PlayListItems(self.youtube)
+    def _lazy(self, name: str, build: Callable[[], Any]) -> Any:
+        with self._lock:
+            if name not in self._parts:
+                self._parts[name] = build()
+            return self._parts[name]
+
+    @property
+    def youtube(self):
+        return self._lazy("client", self._build_google_api_client)
+
+    @property
+    def driver_pool(self):
+        return self._lazy("driver_pool", self._build_driver_pool)
+
+    @property
+    def resolver(self) -> Resolver:
+        return self._lazy("resolver", self._build_resolver)
+
+    @cached_property
+    def playlist(self) -> Playlists:
+        return Playlists(self.youtube, self.quota)
+
+    @cached_property
+    def playlist_items(self) -> PlayListItems:
+        return PlayListItems(self.youtube, self.quota)
+
+    @cached_property
+    def videos(self) -> Videos:
+        return Videos(self.youtube, self.quota)
+
+    @cached_property
+    def search(self) -> Search:
+        return Search(self.youtube, self.quota)
 
     def _build_google_api_client(self):
-        flow = google_auth.InstalledAppFlow.from_client_secrets_file(
-            self.secret_file, self.SCOPE
-        )
-        credentials = flow.run_local_server()
+        import googleapiclient.discovery as google_client
 
+        from src.youtube.auth import load_credentials
+
+        credentials = load_credentials(
+            self.secret_file, self.SCOPE, self.token_file, self.interactive_auth
+        )
+        # the discovery document shipped with the library, no request to fetch it
         return google_client.build(
-            self.API_SERVICE_NAME, self.API_VERSION, credentials=credentials
+            self.API_SERVICE_NAME,
+            self.API_VERSION,
+            credentials=credentials,
+            static_discovery=True,
+            cache_discovery=False,
         )
 
-    def search_video_by_api(self, query):
-        raise NotImplementedError
+    def _build_driver_pool(self):
+        from src.youtube.search import WebdriverPool
 
-    def search_video_by_web_scraping(self, track, webdriver: str = "Chrome"):
-        searcher = YTSearch(webdriver)
-        return searcher.search_id(track)
+        return WebdriverPool(
+            self.webdriver, size=self.driver_pool_size, lean=self.lean_scraping
+        )
+
+    def _build_resolver(self) -> Resolver:
+        # the fastest backend is tried first, the others are the fallback
+        return AdaptiveResolver(
+            [
+                HttpResolver(),
+                SeleniumResolver(self.driver_pool),
+                ApiResolver(self.search_video_by_api),
+            ],
+            quota=self.quota,
+            budget=self.search_quota,
+        )
+
+    def search_video_by_api(self, query) -> str:
+        """
+        Search the video with search.list (100 quota units).
+        Args:
+            query (Union[str, Track]):  The search query or the track to search.
+        Returns:
+            str:                        The id of the first video found.
+        """
+        if isinstance(query, Track):
+            query = " ".join([*query.extract_artists(), query.title])
+        video_id = self.search.video_id(query)
+        if not video_id:
+            raise VideoNotFoundException(f"No video found for '{query}'.")
+        return video_id
+
+    def search_video_by_web_scraping(self, track):
+        return self.resolver.resolve(track)
+
+    def report(self) -> str:
+        """
+        The counters of the webdriver pool and the resolvers, when they were used.
+        """
+        with self._lock:
+            parts = [self._parts.get(name) for name in ("driver_pool", "resolver")]
+        return "\n".join(part.report() for part in parts if part is not None)
+
+    def close(self) -> None:
+        with self._lock:
+            resolver = self._parts.pop("resolver", None)
+            driver_pool = self._parts.pop("driver_pool", None)
+        if resolver:
+            resolver.close()
+        if driver_pool:
+            driver_pool.close()
 
     def create_playlist(self, playlist: Playlist) -> Optional[str]:
         # create playlist
@@ -113,7 +577,7 @@ class Youtube:
         return response.get("id") if response else None
 
     def add_tracks_to_playlist(self, playlist_id, playlist: Playlist) -> None:
-        for track in playlist.items:
+        for track in playlist:
             video_id = self.search_video_by_web_scraping(track)
             # create request to YouTube api and add song
             print(f"\t Adding song: {track} ", end="")
@@ -123,6 +587,16 @@ class Youtube:
                     "The requested cannot be completed because you have exceeded the quota"
                 )
 
-    def add_track_to_playlist(self, playlist_id: str, youtube_id: str):
-        song = self.playlist_items.insert(playlist_id, youtube_id)
+    def get_playlist_video_ids(self, playlist_id: str) -> List[str]:
+        return list(self.playlist_items.list_video_ids(playlist_id))
+
+    def check_videos(
+        self, video_ids: List[str], region: Optional[str] = None
+    ) -> Dict[str, bool]:
+        return self.videos.check(video_ids, region)
+
+    def add_track_to_playlist(
+        self, playlist_id: str, youtube_id: str, position: Optional[int] = None
+    ):
+        song = self.playlist_items.insert(playlist_id, youtube_id, position)
         return True if song else False
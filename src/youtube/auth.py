@@ -0,0 +1,68 @@
+import os
+from typing import Optional, Sequence
+
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+
+
+def load_credentials(
+    client_secret_file: str,
+    scopes: Sequence[str],
+    token_file: Optional[str] = None,
+    interactive: bool = True,
+) -> Credentials:
+    """
+    Return the OAuth credentials stored in `token_file`, refreshed when they expired. The browser
+    consent flow runs only when there are no usable stored credentials.
+    Args:
+        client_secret_file (str):   The OAuth client file downloaded from the Google console.
+        scopes (Sequence[str]):     The scopes the credentials must have.
+        token_file (str):           Where the credentials are kept between runs, None to not keep them.
+        interactive (bool):         False raises instead of running the consent flow, for processes
+                                    that must only use the credentials stored by another one.
+    Returns:
+        Credentials:                Valid credentials.
+    Raises:
+        RuntimeError:               Not interactive and there are no usable stored credentials.
+    """
+    credentials = None
+    if token_file and os.path.exists(token_file):
+        try:
+            credentials = Credentials.from_authorized_user_file(token_file, scopes)
+        except ValueError:
+            credentials = None
+
+    if credentials and credentials.valid:
+        return credentials
+    if credentials and credentials.expired and credentials.refresh_token:
+        try:
+            credentials.refresh(Request())
+        except RefreshError:
+            # the refresh token was revoked, ask for consent again
+            credentials = None
+        else:
+            save_credentials(credentials, token_file)
+            return credentials
+
+    if not interactive:
+        raise RuntimeError(f"No usable YouTube credentials in {token_file}.")
+    flow = InstalledAppFlow.from_client_secrets_file(client_secret_file, scopes)
+    credentials = flow.run_local_server()
+    save_credentials(credentials, token_file)
+    return credentials
+
+
+def save_credentials(credentials: Credentials, token_file: Optional[str]) -> None:
+    if not token_file:
+        return
+    # the file holds a refresh token, only the owner may read it
+    tmp_file = f"{token_file}.{os.getpid()}.tmp"
+    try:
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(credentials.to_json())
+        os.replace(tmp_file, token_file)
+    except OSError:
+        pass
@@ -8,3 +8,9 @@ class ExceedQuotaException(Exception):
     def __init__(self, message):
         super(ExceedQuotaException, self).__init__(message)
         self.message = message
+
+
+class ResolverError(Exception):
+    def __init__(self, message):
+        super(ResolverError, self).__init__(message)
+        self.message = message
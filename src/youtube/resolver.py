@@ -0,0 +1,344 @@
+import json
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+import requests
+from googleapiclient.errors import HttpError
+from requests.adapters import HTTPAdapter
+
+from src import metrics
+from src.spotify.models import Track
+from src.youtube.exception import ResolverError, VideoNotFoundException
+from src.youtube.url import UrlBuilder
+
+if TYPE_CHECKING:
+    from src.youtube.search import WebdriverPool
+
+
+class Resolver(ABC):
+    """
+    Finds the YouTube video id of a Spotify track.
+    """
+
+    name = "resolver"
+    # seconds per track assumed before anything was measured
+    expected_latency = 1.0
+    # the quota operation charged per track, None for backends that are free
+    operation: Optional[str] = None
+
+    @abstractmethod
+    def resolve(self, track: Track) -> str:
+        """
+        Raises:
+            VideoNotFoundException:     The search worked but returned no video.
+            ResolverError:              The backend failed, another backend may still succeed.
+        """
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        pass
+
+
+class HttpResolver(Resolver):
+    """
+    Browserless backend. Fetches the results page over a pooled HTTP session and reads the video ids
+    from the `ytInitialData` JSON embedded in the page.
+    """
+
+    name = "http"
+    INITIAL_DATA_PATTERN = re.compile(r"ytInitialData\"?\]?\s*=\s*")
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+        "Accept-Language": "en-US,en;q=0.9",
+    }
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        pool_size: int = 10,
+        timeout: int = 10,
+    ):
+        self.session = session or self._build_session(pool_size)
+        self.timeout = timeout
+        self.url_builder = UrlBuilder()
+
+    def _build_session(self, pool_size: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.headers.update(self.HEADERS)
+        # skip the EU cookie consent interstitial
+        session.cookies.set("CONSENT", "YES+", domain=".youtube.com")
+        return session
+
+    @classmethod
+    def extract_initial_data(cls, html: str) -> Any:
+        match = cls.INITIAL_DATA_PATTERN.search(html)
+        if not match:
+            raise ResolverError("The page has no ytInitialData.")
+        try:
+            data, _ = json.JSONDecoder().raw_decode(html, match.end())
+        except ValueError as e:
+            raise ResolverError(f"Invalid ytInitialData: {e}") from e
+        return data
+
+    @staticmethod
+    def _walk_video_ids(data: Any) -> Iterator[str]:
+        # iterative pre-order walk so the ids come out in page order
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                renderer = node.get("videoRenderer")
+                if isinstance(renderer, dict) and renderer.get("videoId"):
+                    yield renderer["videoId"]
+                    continue
+                stack.extend(reversed(list(node.values())))
+            elif isinstance(node, list):
+                stack.extend(reversed(node))
+
+    @staticmethod
+    def _reports_no_results(data: Any) -> bool:
+        # YouTube shows a promo ("No results found") in an otherwise empty results section
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                if "backgroundPromoRenderer" in node:
+                    return True
+                section = node.get("itemSectionRenderer")
+                if isinstance(section, dict) and not section.get("contents"):
+                    return True
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+        return False
+
+    @classmethod
+    def extract_ids(cls, html: str) -> List[str]:
+        return list(cls._walk_video_ids(cls.extract_initial_data(html)))
+
+    def parse(self, html: str) -> str:
+        data = self.extract_initial_data(html)
+        for video_id in self._walk_video_ids(data):
+            return video_id
+        if self._reports_no_results(data):
+            raise VideoNotFoundException("No suitable video found.")
+        # a changed page layout must not look like a track missing from YouTube
+        raise ResolverError("No video renderer in ytInitialData.")
+
+    def resolve(self, track: Track) -> str:
+        url = self.url_builder.build(track)
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise ResolverError(f"Failed to fetch search results: {e}") from e
+        return self.parse(response.text)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class SeleniumResolver(Resolver):
+    """
+    Headless browser backend, slow but it sees the page exactly like a user.
+    """
+
+    name = "selenium"
+    expected_latency = 6.0
+
+    def __init__(self, pool: "WebdriverPool"):
+        # selenium is imported only when a browser may be needed
+        from src.youtube.search import YTSearch
+
+        self.searcher = YTSearch(pool=pool, lean=pool.lean)
+
+    def resolve(self, track: Track) -> str:
+        from selenium.common.exceptions import WebDriverException
+
+        try:
+            return self.searcher.search_id(track)
+        except WebDriverException as e:
+            # a missing or crashed browser, the pool has already replaced the driver
+            raise ResolverError(f"The browser failed: {e.msg}") from e
+        except OSError as e:
+            # the connection to the driver process broke or timed out
+            raise ResolverError(f"The browser can't be reached: {e}") from e
+
+
+class ApiResolver(Resolver):
+    """
+    YouTube Data API backend (search.list). The fastest and most reliable one, but every search costs
+    100 quota units.
+    """
+
+    name = "api"
+    expected_latency = 0.5
+    operation = "search.list"
+
+    def __init__(self, search: Callable[[Track], str]):
+        self.search = search
+
+    def resolve(self, track: Track) -> str:
+        try:
+            return self.search(track)
+        except (HttpError, OSError) as e:
+            # OSError covers the connection errors and timeouts left after the retries
+            raise ResolverError(f"Search request failed: {e}") from e
+
+
+@dataclass
+class BackendStats:
+    # moving average of the seconds per resolution
+    latency: float
+    chosen: int = 0
+    attempts: int = 0
+    found: int = 0
+    not_found: int = 0
+    errors: int = 0
+    quota: int = 0
+
+    @property
+    def answer_rate(self) -> float:
+        # smoothed, so a backend isn't written off (or trusted) after a single try
+        return (self.found + self.not_found + 1) / (self.attempts + 2)
+
+    @property
+    def score(self) -> float:
+        """
+        Expected seconds until the backend gives an answer, lower is better.
+        """
+        return self.latency / self.answer_rate
+
+
+class AdaptiveResolver(Resolver):
+    """
+    Picks the backend per track by its measured latency and success rate. Backends that cost quota
+    are only used while the search budget and the remaining daily quota allow it. The other backends
+    are kept as the fallback when the chosen one fails.
+    """
+
+    name = "adaptive"
+    # weight of the newest measurement in the latency average
+    SMOOTHING = 0.2
+    # every n-th track starts with the runner-up, so a backend that got slow or failed can recover
+    EXPLORE_INTERVAL = 20
+
+    def __init__(self, resolvers: Sequence[Resolver], quota=None, budget: int = 0):
+        """
+        Args:
+            resolvers (Sequence[Resolver]):     The backends.
+            quota (QuotaTracker):               The tracker charged by backends with an operation.
+            budget (int):                       Quota units the backends may spend in this run.
+        """
+        if not resolvers:
+            raise ValueError("At least one resolver is required.")
+        self.resolvers = list(resolvers)
+        self.quota = quota
+        self.budget = budget
+        self.spent = 0
+        self.calls = 0
+        self.stats: Dict[str, BackendStats] = {
+            resolver.name: BackendStats(latency=resolver.expected_latency)
+            for resolver in self.resolvers
+        }
+        self._lock = threading.Lock()
+
+    def _affordable(self, resolver: Resolver) -> bool:
+        if resolver.operation is None:
+            return True
+        if self.quota is None:
+            return False
+        cost = self.quota.cost(resolver.operation)
+        return self.spent + cost <= self.budget and cost <= self.quota.remaining
+
+    def choose(self) -> List[Resolver]:
+        """
+        Order the affordable backends, the first one is tried first.
+        """
+        with self._lock:
+            self.calls += 1
+            candidates = sorted(
+                (resolver for resolver in self.resolvers if self._affordable(resolver)),
+                key=lambda resolver: self.stats[resolver.name].score,
+            )
+            if len(candidates) > 1 and self.calls % self.EXPLORE_INTERVAL == 0:
+                candidates[0], candidates[1] = candidates[1], candidates[0]
+            if candidates:
+                self.stats[candidates[0].name].chosen += 1
+        return candidates
+
+    def _reserve(self, resolver: Resolver) -> bool:
+        # concurrent workers mustn't overshoot the budget together
+        if resolver.operation is None:
+            return True
+        with self._lock:
+            if not self._affordable(resolver):
+                return False
+            cost = self.quota.cost(resolver.operation)
+            self.spent += cost
+            self.stats[resolver.name].quota += cost
+        return True
+
+    def _record(self, resolver: Resolver, started: float, outcome: str) -> None:
+        elapsed = time.perf_counter() - started
+        metrics.observe(f"resolve.{resolver.name}", elapsed)
+        metrics.count(f"resolve.{resolver.name}.{outcome}")
+        with self._lock:
+            stats = self.stats[resolver.name]
+            stats.attempts += 1
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+            if outcome != "errors":
+                stats.latency += self.SMOOTHING * (elapsed - stats.latency)
+
+    def resolve(self, track: Track) -> str:
+        error = ResolverError("No resolver is available.")
+        for resolver in self.choose():
+            if not self._reserve(resolver):
+                continue
+            started = time.perf_counter()
+            try:
+                video_id = resolver.resolve(track)
+            except VideoNotFoundException:
+                self._record(resolver, started, "not_found")
+                raise
+            except ResolverError as e:
+                self._record(resolver, started, "errors")
+                error = e
+                continue
+            self._record(resolver, started, "found")
+            return video_id
+        raise error
+
+    def report(self) -> str:
+        lines = [f"Resolvers: {self.spent} of {self.budget} search quota units spent."]
+        for name, stats in self.stats.items():
+            lines.append(
+                f"\t{name}: chosen {stats.chosen}, {stats.attempts} attempts, "
+                f"{stats.found} found, {stats.not_found} not found, {stats.errors} errors, "
+                f"{stats.latency:.2f}s avg, {stats.quota} units"
+            )
+        return "\n".join(lines)
+
+    def counters(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: asdict(stats) for name, stats in self.stats.items()}
+
+    def close(self) -> None:
+        for resolver in self.resolvers:
+            resolver.close()
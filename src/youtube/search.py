@@ -1,50 +1,235 @@
 import re
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
+from typing import Dict, Iterator, Optional
 
 from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from src import metrics
 from src.spotify.models import Track
 from src.youtube.exception import VideoNotFoundException
+from src.youtube.url import UrlBuilder
 
 
 class WebdriverFactory:
+    # lean mode: the search only reads links, so pictures, fonts and video are never downloaded
+    BLOCKED_CONTENT = {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    }
+    BLOCKED_URLS = [
+        "*.jpg",
+        "*.jpeg",
+        "*.png",
+        "*.webp",
+        "*.gif",
+        "*.woff",
+        "*.woff2",
+        "*.ttf",
+        "*googlevideo.com*",
+        "*ytimg.com/vi*",
+    ]
+
     def __init__(self, driver):
         self.driver = driver
 
     @classmethod
-    def create_webdriver(cls, name_driver: str) -> "WebdriverFactory":
+    def create_webdriver(
+        cls, name_driver: str, lean: bool = False
+    ) -> "WebdriverFactory":
         match name_driver.upper():
             case "CHROME":
                 chrome_options = Options()
                 # run the chrome without the GUI
                 chrome_options.add_argument("--headless")
                 chrome_options.add_argument("--disable-gpu")
-                return WebdriverFactory(webdriver.Chrome(options=chrome_options))
+                if lean:
+                    # don't wait for subresources, the results are in the DOM before they load
+                    chrome_options.page_load_strategy = "eager"
+                    chrome_options.add_experimental_option("prefs", cls.BLOCKED_CONTENT)
+                    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+                    chrome_options.add_argument("--mute-audio")
+                    chrome_options.add_argument(
+                        "--autoplay-policy=document-user-activation-required"
+                    )
+                driver = webdriver.Chrome(options=chrome_options)
+                if lean:
+                    driver.execute_cdp_cmd("Network.enable", {})
+                    driver.execute_cdp_cmd(
+                        "Network.setBlockedURLs", {"urls": cls.BLOCKED_URLS}
+                    )
+                return WebdriverFactory(driver)
             case _:
                 raise ValueError(f"Unsupported driver name: {name_driver}")
 
 
-class UrlBuilder:
-    def __init__(self, base_url: str = "https://www.youtube.com/results?search_query="):
-        self.base_url = base_url
+class WebdriverPool:
+    """
+    Fixed-size pool of warm webdrivers. Drivers are started lazily, leased for a single search
+    and returned afterwards. A driver is quit and replaced after `max_uses` leases or when it crashes.
+    """
+
+    def __init__(
+        self,
+        webdriver_name: str = "Chrome",
+        size: int = 2,
+        max_uses: int = 100,
+        lean: bool = False,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.webdriver_name = webdriver_name
+        self.lean = lean
+        self.size = size
+        self.max_uses = max_uses
+        # idle drivers; `None` marks a free slot where a new driver may be started
+        self._idle: LifoQueue = LifoQueue()
+        self._uses: Dict[int, int] = {}
+        self._slots = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {
+            "leases": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "created": 0,
+            "recycled": 0,
+        }
+
+    def _create(self):
+        try:
+            with metrics.timer("selenium.driver_start"):
+                driver = WebdriverFactory.create_webdriver(
+                    self.webdriver_name, lean=self.lean
+                ).driver
+        except Exception:
+            # give the slot back so that the next lease can try again
+            self._idle.put(None)
+            raise
+        with self._lock:
+            self._uses[id(driver)] = 0
+            self.stats["created"] += 1
+        return driver
+
+    def _acquire(self):
+        try:
+            driver = self._idle.get_nowait()
+        except Empty:
+            with self._lock:
+                free_slot = self._slots < self.size
+                if free_slot:
+                    self._slots += 1
+            if free_slot:
+                driver = None
+            else:
+                start = time.perf_counter()
+                driver = self._idle.get()
+                with self._lock:
+                    self.stats["waits"] += 1
+                    self.stats["wait_time"] += time.perf_counter() - start
+        with self._lock:
+            self.stats["leases"] += 1
+        return driver if driver is not None else self._create()
+
+    def _quit(self, driver) -> None:
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def _release(self, driver, crashed: bool) -> None:
+        with self._lock:
+            self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+            worn_out = self._uses[id(driver)] >= self.max_uses
+        if self._closed:
+            self._quit(driver)
+        elif crashed or worn_out:
+            self._quit(driver)
+            with self._lock:
+                self.stats["recycled"] += 1
+            self._idle.put(None)
+        else:
+            self._idle.put(driver)
 
-    def build(self, track: Track):
-        authors = "+".join([artist.name.replace(" ", "+") for artist in track.artists])
-        title = track.title.replace(" ", "+")
-        search_query = "+".join(filter(None, [authors, title]))
-        return f"{self.base_url}{search_query}"
+    @contextmanager
+    def lease(self) -> Iterator:
+        """
+        Lease a driver for the duration of the `with` block.
+        """
+        if self._closed:
+            raise RuntimeError("Webdriver pool is closed.")
+        driver = self._acquire()
+        crashed = False
+        try:
+            yield driver
+        except TimeoutException:
+            raise
+        except WebDriverException:
+            crashed = True
+            raise
+        finally:
+            self._release(driver, crashed)
+
+    @property
+    def wait_ratio(self) -> float:
+        leases = self.stats["leases"]
+        return self.stats["waits"] / leases if leases else 0.0
+
+    def report(self) -> str:
+        return (
+            f"Webdriver pool: {self.stats['leases']} leases, "
+            f"{self.stats['waits']} waited ({self.wait_ratio:.0%}, {self.stats['wait_time']:.2f}s), "
+            f"{self.stats['created']} started, {self.stats['recycled']} recycled."
+        )
+
+    def close(self) -> None:
+        """
+        Quit every idle driver. Drivers that are still leased are quit when they are returned.
+        """
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except Empty:
+                break
+            if driver is not None:
+                self._quit(driver)
 
 
 class YTSearch:
-    SEARCH_PATTERN = re.compile(r"https\:\/\/www\.youtube.com\/watch\?v\=(.*)&pp=.*")
+    # the id is followed by &pp=..., &t=... or nothing
+    SEARCH_PATTERN = re.compile(r"https\:\/\/www\.youtube\.com\/watch\?v=([\w-]{11})")
+    RESULTS_SELECTOR = "div#contents ytd-video-renderer"
+    # every result link in one round trip, an empty list until the results are rendered
+    HREFS_SCRIPT = (
+        "return Array.from(document.querySelectorAll("
+        f"'{RESULTS_SELECTOR} a#video-title'))"
+        ".map(link => link.href).filter(Boolean);"
+    )
 
-    def __init__(self, webdriver_name: Optional[str] = "Chrome"):
-        self.driver = WebdriverFactory.create_webdriver(webdriver_name).driver
+    def __init__(
+        self,
+        webdriver_name: Optional[str] = "Chrome",
+        pool: Optional[WebdriverPool] = None,
+        lean: bool = False,
+    ):
+        # with a pool the driver is leased per search, otherwise the searcher owns its driver
+        self.pool = pool
+        self.lean = lean
+        self.driver = (
+            None
+            if pool
+            else WebdriverFactory.create_webdriver(webdriver_name, lean=lean).driver
+        )
         self.url_builder = UrlBuilder()
 
     def find_id_by_href(self, href) -> str:
@@ -53,28 +238,66 @@ class YTSearch:
             return match.group(1)
         raise ValueError("Invalid YouTube URL")
 
+    def close(self) -> None:
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+
     def search_id(self, track: Track) -> str:
         url = self.url_builder.build(track)
-        self.driver.get(url)
+        if self.pool:
+            # the lease covers the wait for a free driver and starting a new one
+            lease_start = time.perf_counter()
+            with self.pool.lease() as driver:
+                metrics.observe("selenium.lease", time.perf_counter() - lease_start)
+                return self._search_id(driver, url)
+        return self._search_id(self.driver, url)
+
+    def _search_id(self, driver, url: str) -> str:
+        with metrics.timer("selenium.page_load"):
+            driver.get(url)
+        if self.lean:
+            return self._search_id_lean(driver)
 
         try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "div#contents ytd-video-renderer")
+            with metrics.timer("selenium.wait"):
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, self.RESULTS_SELECTOR)
+                    )
                 )
-            )
         except TimeoutException:
             raise VideoNotFoundException("No video found within the time limit.")
 
         # Try to find any content
-        contents = self.driver.find_elements(
-            By.CSS_SELECTOR, "div#contents ytd-video-renderer"
-        )
+        contents = driver.find_elements(By.CSS_SELECTOR, self.RESULTS_SELECTOR)
 
         for content in contents:
             title_element = content.find_element(By.CSS_SELECTOR, "a#video-title")
             href = title_element.get_attribute("href")
-            if href:
+            if not href:
+                continue
+            try:
                 return self.find_id_by_href(href)
+            except ValueError:
+                # shorts and channel links are skipped like in the lean search
+                continue
+
+        raise VideoNotFoundException("No suitable video found.")
+
+    def _search_id_lean(self, driver) -> str:
+        # polling with the script returns the links as soon as they exist, no extra lookups
+        try:
+            with metrics.timer("selenium.wait"):
+                hrefs = WebDriverWait(driver, 10).until(
+                    lambda driver: driver.execute_script(self.HREFS_SCRIPT)
+                )
+        except TimeoutException:
+            raise VideoNotFoundException("No video found within the time limit.")
+
+        for href in hrefs:
+            match = self.SEARCH_PATTERN.search(href)
+            if match:
+                return match.group(1)
 
         raise VideoNotFoundException("No suitable video found.")
@@ -0,0 +1,12 @@
+from src.spotify.models import Track
+
+
+class UrlBuilder:
+    def __init__(self, base_url: str = "https://www.youtube.com/results?search_query="):
+        self.base_url = base_url
+
+    def build(self, track: Track):
+        authors = "+".join([artist.name.replace(" ", "+") for artist in track.artists])
+        title = track.title.replace(" ", "+")
+        search_query = "+".join(filter(None, [authors, title]))
+        return f"{self.base_url}{search_query}"
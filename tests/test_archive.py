@@ -0,0 +1,84 @@
+import gzip
+import json
+
+import pytest
+
+from src.database.archive import export_cache, import_cache
+from src.database.connection import Database, STdb
+from src.database.models import Track
+from src.spotify.models import Artist
+from src.spotify.models import Track as SpotifyTrack
+
+DUET = SpotifyTrack("I Don't Care", [Artist("Ed Sheeran"), Artist("Justin Bieber")])
+OTHER = SpotifyTrack("Shape of You", [Artist("Ed Sheeran")])
+
+
+@pytest.fixture
+def stdb():
+    return STdb(Database("sqlite://"))
+
+
+def uploads(database: STdb, track: SpotifyTrack) -> int:
+    pk = database.search_track(track)[0]
+    with database.db as session:
+        return session.get(Track, pk).uploaded
+
+
+class TestArchive:
+    def test_exported_cache_should_be_imported_into_empty_database(
+        self, stdb, tmp_path
+    ):
+        path = str(tmp_path / "cache.jsonl.gz")
+        stdb.add_tracks([(DUET, "y83x7MgzWOA"), (OTHER, "JGwWNGJdvx8")])
+        stdb.update_uploads([stdb.search_track(OTHER)[0]] * 2)
+        stdb.mark_validated([stdb.search_track(DUET)[0]], [])
+
+        assert export_cache(stdb, path) == 2
+        target = STdb(Database("sqlite://"))
+        summary = import_cache(target, path, batch_size=1)
+
+        assert summary == {"read": 2, "inserted": 2, "merged": 0}
+        assert target.search_track(DUET)[1] == "y83x7MgzWOA"
+        assert uploads(target, OTHER) == 3
+        assert target.get_unvalidated(max_age_days=30) == [
+            (target.search_track(OTHER)[0], "JGwWNGJdvx8")
+        ]
+
+    def test_import_should_merge_with_stored_tracks(self, stdb, tmp_path):
+        path = str(tmp_path / "cache.jsonl.gz")
+        records = [
+            {
+                "title": "Shape of You",
+                "artists": ["Ed Sheeran"],
+                "youtube_id": "imported111",
+                "uploaded": 5,
+            },
+            {
+                "title": "I Don't Care",
+                "artists": ["Justin Bieber", "Ed Sheeran"],
+                "youtube_id": "imported222",
+                "uploaded": 1,
+            },
+        ]
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            file.writelines(json.dumps(record) + "\n" for record in records)
+        stdb.add_tracks([(DUET, "y83x7MgzWOA"), (OTHER, "JGwWNGJdvx8")])
+        stdb.update_uploads([stdb.search_track(DUET)[0]] * 3)
+        stdb.mark_validated([], [stdb.search_track(OTHER)[0]])
+
+        summary = import_cache(stdb, path)
+
+        assert summary == {"read": 2, "inserted": 0, "merged": 2}
+        # the dead video is replaced, the live one is kept
+        assert stdb.search_track(OTHER)[1] == "imported111"
+        assert stdb.search_track(DUET)[1] == "y83x7MgzWOA"
+        assert uploads(stdb, OTHER) == 5
+        assert uploads(stdb, DUET) == 4
+
+    def test_import_should_report_invalid_line(self, stdb, tmp_path):
+        path = str(tmp_path / "cache.jsonl.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            file.write('{"title": "Shape of You"}\n')
+
+        with pytest.raises(ValueError, match="cache.jsonl.gz:1"):
+            import_cache(stdb, path)
@@ -0,0 +1,63 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.youtube.auth import load_credentials
+
+SCOPES = ["https://www.googleapis.com/auth/youtube.force-ssl"]
+
+
+class TestLoadCredentials:
+    @patch("src.youtube.auth.InstalledAppFlow")
+    @patch("src.youtube.auth.Credentials")
+    def test_should_reuse_stored_credentials(
+        self, mock_credentials, mock_flow, tmp_path
+    ):
+        token_file = tmp_path / "token.json"
+        token_file.write_text("{}")
+        stored = mock_credentials.from_authorized_user_file.return_value
+        stored.valid = True
+
+        assert load_credentials("secret.json", SCOPES, str(token_file)) is stored
+        mock_flow.from_client_secrets_file.assert_not_called()
+
+    @patch("src.youtube.auth.InstalledAppFlow")
+    @patch("src.youtube.auth.Credentials")
+    def test_should_refresh_expired_credentials_and_store_them(
+        self, mock_credentials, mock_flow, tmp_path
+    ):
+        token_file = tmp_path / "token.json"
+        token_file.write_text("{}")
+        stored = mock_credentials.from_authorized_user_file.return_value
+        stored.valid = False
+        stored.expired = True
+        stored.to_json.return_value = json.dumps({"token": "refreshed"})
+
+        assert load_credentials("secret.json", SCOPES, str(token_file)) is stored
+        stored.refresh.assert_called_once()
+        mock_flow.from_client_secrets_file.assert_not_called()
+        assert json.loads(token_file.read_text()) == {"token": "refreshed"}
+
+    @patch("src.youtube.auth.InstalledAppFlow")
+    def test_should_run_consent_flow_without_stored_credentials(
+        self, mock_flow, tmp_path
+    ):
+        token_file = tmp_path / "token.json"
+        flow = mock_flow.from_client_secrets_file.return_value
+        flow.run_local_server.return_value.to_json.return_value = "{}"
+
+        load_credentials("secret.json", SCOPES, str(token_file))
+
+        flow.run_local_server.assert_called_once()
+        assert token_file.exists()
+
+    @patch("src.youtube.auth.InstalledAppFlow")
+    def test_should_not_run_consent_flow_when_not_interactive(
+        self, mock_flow, tmp_path
+    ):
+        token_file = tmp_path / "token.json"
+
+        with pytest.raises(RuntimeError):
+            load_credentials("secret.json", SCOPES, str(token_file), interactive=False)
+        mock_flow.from_client_secrets_file.assert_not_called()
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src import batch
+from src.batch import process_playlist, read_playlist_ids, run_batch
+from src.spot_tube import TransferReport
+
+
+class TestReadPlaylistIds:
+    def test_should_skip_blank_lines_and_comments(self):
+        lines = [
+            "37i9dQZF1DXcBWIGoYBM5M\n",
+            "\n",
+            "# weekly\n",
+            "  5ABHKGoOzxkaa28ttQV9sE  \n",
+        ]
+
+        assert read_playlist_ids(lines) == [
+            "37i9dQZF1DXcBWIGoYBM5M",
+            "5ABHKGoOzxkaa28ttQV9sE",
+        ]
+
+
+def transfer(playlist_id):
+    if playlist_id == "broken":
+        raise RuntimeError("spotify is down")
+    batch._app.report = TransferReport(
+        playlist_id, name=playlist_id, inserted=2, ok=True, skipped=["a track"]
+    )
+    return True
+
+
+@pytest.fixture
+def app():
+    # worker processes are replaced by threads sharing one mocked app
+    app = MagicMock()
+    app.do_transfer.side_effect = transfer
+    with patch.object(batch, "_app", app), patch.object(
+        batch,
+        "ProcessPoolExecutor",
+        lambda max_workers, initializer: ThreadPoolExecutor(1),
+    ), patch.object(batch, "authorize_youtube") as authorize:
+        yield app, authorize
+
+
+class TestRunBatch:
+    def test_process_playlist_should_capture_error(self, app):
+        result = process_playlist("broken")
+
+        assert result["ok"] is False
+        assert result["error"] == "RuntimeError('spotify is down')"
+
+    def test_should_summarize_playlists_in_input_order(self, app):
+        _, authorize = app
+
+        summary = run_batch(["first", "broken", "second"], workers=2)
+
+        authorize.assert_called_once()
+        assert [result["playlist_id"] for result in summary["playlists"]] == [
+            "first",
+            "broken",
+            "second",
+        ]
+        assert summary["playlists"][0]["error"] is None
+        assert (summary["succeeded"], summary["failed"]) == (2, 1)
+        assert (summary["inserted"], summary["skipped"]) == (4, 2)
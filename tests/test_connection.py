@@ -0,0 +1,263 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import sqlalchemy as sa
+
+from src.database.connection import Database, STdb
+from src.database.models import Artist, Track
+from src.spotify.models import Artist as SpotifyArtist
+from src.spotify.models import Playlist as SpotifyPlaylist
+from src.spotify.models import Track as SpotifyTrack
+
+DUET = SpotifyTrack(
+    "I Don't Care", [SpotifyArtist("Ed Sheeran"), SpotifyArtist("Justin Bieber")]
+)
+SOLO = SpotifyTrack("I Don't Care", [SpotifyArtist("Ed Sheeran")])
+OTHER = SpotifyTrack("Shape of You", [SpotifyArtist("Ed Sheeran")])
+
+
+@pytest.fixture
+def stdb():
+    return STdb(Database("sqlite://"))
+
+
+class TestSTdbBulk:
+    def test_search_tracks_should_map_found_tracks_by_index(self, stdb):
+        stdb.add_tracks([(DUET, "y83x7MgzWOA"), (SOLO, "ymjNGjuBCTo")])
+        reversed_duet = SpotifyTrack(DUET.title, list(reversed(DUET.artists)))
+
+        result = stdb.search_tracks([OTHER, SOLO, reversed_duet])
+
+        assert set(result) == {1, 2}
+        assert result[1][1] == "ymjNGjuBCTo"
+        assert result[2][1] == "y83x7MgzWOA"
+
+    def test_add_tracks_should_add_repeated_track_once(self, stdb):
+        stdb.add_tracks([(OTHER, "JGwWNGJdvx8"), (OTHER, "JGwWNGJdvx8")])
+
+        with stdb.db as session:
+            assert session.query(Track).count() == 1
+
+    def test_update_uploads_should_count_repeated_pks(self, stdb):
+        stdb.add_tracks([(SOLO, "ymjNGjuBCTo"), (OTHER, "JGwWNGJdvx8")])
+        found = stdb.search_tracks([SOLO, OTHER])
+        solo_pk, other_pk = found[0][0], found[1][0]
+
+        stdb.update_uploads([solo_pk, solo_pk, other_pk])
+
+        with stdb.db as session:
+            assert session.get(Track, solo_pk).uploaded == 3
+            assert session.get(Track, other_pk).uploaded == 2
+
+
+class TestFuzzyMatch:
+    @pytest.mark.parametrize(
+        "title",
+        [
+            "Shape of You - Remastered 2017",
+            "Shape of You (feat. Stormzy)",
+            "Shape Of You [2017 Remaster]",
+            "Shapé of You",
+        ],
+    )
+    def test_search_tracks_should_find_other_release_of_stored_track(self, stdb, title):
+        stdb.add_tracks([(OTHER, "JGwWNGJdvx8")])
+
+        result = stdb.search_tracks([SpotifyTrack(title, OTHER.artists)])
+
+        assert result[0][1] == "JGwWNGJdvx8"
+
+    def test_search_tracks_should_find_near_duplicate_above_threshold(self, stdb):
+        artists = [SpotifyArtist("Simon & Garfunkel")]
+        stdb.add_tracks(
+            [(SpotifyTrack("The Sounds of Silence", artists), "4zLfCnGVeL4")]
+        )
+
+        result = stdb.search_tracks(
+            [
+                SpotifyTrack("Sound of Silence", artists),
+                SpotifyTrack("Silence", artists),
+                SpotifyTrack("The Sounds of Silence 2", artists),
+                SpotifyTrack("The Sounds of Silence", [SpotifyArtist("Disturbed")]),
+                SpotifyTrack("The Sounds of Silence - Live", artists),
+            ]
+        )
+
+        assert set(result) == {0}
+
+    def test_fuzzy_lookup_can_be_turned_off(self, stdb):
+        stdb.track_manager.fuzzy_threshold = None
+        stdb.add_tracks([(OTHER, "JGwWNGJdvx8")])
+
+        assert (
+            stdb.search_track(
+                SpotifyTrack("Shape of You (feat. Stormzy)", OTHER.artists)
+            )
+            is None
+        )
+
+
+class TestConcurrency:
+    def test_file_database_should_use_wal(self, tmp_path):
+        database = Database(f"sqlite:///{tmp_path / 'cache.db'}")
+
+        with database as session:
+            assert session.execute(sa.text("PRAGMA journal_mode")).scalar() == "wal"
+
+    def test_sessions_should_be_kept_per_thread(self, tmp_path):
+        stdb = STdb(Database(f"sqlite:///{tmp_path / 'cache.db'}"))
+        tracks = [SpotifyTrack(f"Song {n}", [SpotifyArtist("Band")]) for n in range(40)]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda track: stdb.add_track(track, "dQw4w9WgXcQ"), tracks))
+
+        assert len(stdb.search_tracks(tracks)) == 40
+
+    def test_writer_should_commit_queued_writes_in_batches(self, tmp_path):
+        stdb = STdb(Database(f"sqlite:///{tmp_path / 'cache.db'}"), write_interval=5)
+        stdb.add_tracks([(OTHER, "JGwWNGJdvx8")])
+        stdb.flush()
+        pk = stdb.search_track(OTHER)[0]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda _: stdb.update_upload(pk), range(20)))
+        stdb.add_track(SOLO, "ymjNGjuBCTo")
+        stdb.close()
+
+        assert stdb.writer.batches == 2
+        with stdb.db as session:
+            assert session.get(Track, pk).uploaded == 21
+        assert stdb.search_track(SOLO)[1] == "ymjNGjuBCTo"
+
+    def test_flush_should_return_after_close(self, stdb):
+        stdb = STdb(stdb.db, write_interval=0)
+        stdb.add_track(OTHER, "JGwWNGJdvx8")
+        stdb.close()
+
+        stdb.flush()
+        assert stdb.search_track(OTHER)[1] == "JGwWNGJdvx8"
+
+    def test_flush_should_raise_error_of_failed_batch(self, stdb):
+        stdb = STdb(stdb.db, write_interval=0)
+        stdb.track_manager.update_uploads = lambda session, pks: 1 / 0
+        stdb.update_upload(1)
+
+        with pytest.raises(ZeroDivisionError):
+            stdb.flush()
+        stdb.close()
+
+
+class TestMigrations:
+    def test_should_backfill_track_key_of_old_database(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'old.db'}"
+        engine = sa.create_engine(url)
+        with engine.begin() as connection:
+            for statement in [
+                "CREATE TABLE artist_table (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL)",
+                "CREATE TABLE track_table (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, "
+                "youtube_id VARCHAR NOT NULL, uploaded INTEGER NOT NULL)",
+                "CREATE TABLE association_table (artist_id INTEGER, track_id INTEGER)",
+                "INSERT INTO artist_table VALUES (1, 'Ed Sheeran'), (2, 'ed sheeran')",
+                "INSERT INTO track_table VALUES (1, 'Shape of You', 'JGwWNGJdvx8', 2), "
+                "(2, 'shape of you', 'JGwWNGJdvx8', 3)",
+                "INSERT INTO association_table VALUES (1, 1), (2, 2)",
+            ]:
+                connection.execute(sa.text(statement))
+        engine.dispose()
+
+        stdb = STdb(Database(url))
+
+        pk, youtube_id = stdb.search_track(OTHER)
+        assert (pk, youtube_id) == (1, "JGwWNGJdvx8")
+        with stdb.db as session:
+            assert session.query(Track).count() == 1
+            assert session.get(Track, 1).uploaded == 5
+        remaster = SpotifyTrack("Shape of You - Remastered 2017", OTHER.artists)
+        assert stdb.search_track(remaster) == (1, "JGwWNGJdvx8")
+
+
+class TestArtistCache:
+    def test_add_tracks_should_reuse_artists(self, stdb):
+        stdb.add_tracks([(DUET, "y83x7MgzWOA"), (SOLO, "ymjNGjuBCTo")])
+        stdb.add_tracks([(OTHER, "JGwWNGJdvx8")])
+
+        with stdb.db as session:
+            assert session.query(Artist).count() == 2
+        assert set(stdb.artist_manager.cache) == {"Ed Sheeran", "Justin Bieber"}
+
+    def test_rolled_back_artists_should_not_be_cached(self, stdb):
+        with pytest.raises(RuntimeError):
+            with stdb.db as session:
+                stdb.track_manager.add_tracks(session, [(SOLO, "ymjNGjuBCTo")])
+                raise RuntimeError()
+
+        assert "Ed Sheeran" not in stdb.artist_manager.cache
+
+    def test_warm_should_load_artists_from_database(self, stdb):
+        stdb.add_tracks([(DUET, "y83x7MgzWOA")])
+
+        warmed = STdb(stdb.db, warm_artist_cache=True)
+
+        assert set(warmed.artist_manager.cache) == {"Ed Sheeran", "Justin Bieber"}
+
+
+class TestMissingTracks:
+    def test_search_missing_should_map_cached_misses_by_index(self, stdb):
+        stdb.add_missing([(SOLO, "no results")])
+
+        assert stdb.search_missing([OTHER, SOLO]) == {1: "no results"}
+
+    def test_search_missing_should_ignore_expired_misses(self, stdb):
+        stdb.add_missing([(SOLO, "no results")], ttl_days=0)
+
+        assert stdb.search_missing([SOLO]) == {}
+
+
+class TestValidation:
+    def test_dead_track_should_be_resolved_again(self, stdb):
+        stdb.add_tracks([(SOLO, "ymjNGjuBCTo")])
+        pk = stdb.search_tracks([SOLO])[0][0]
+
+        stdb.mark_validated(alive=[], dead=[pk])
+        assert stdb.search_tracks([SOLO]) == {}
+        assert stdb.get_unvalidated() == []
+
+        stdb.add_tracks([(SOLO, "new-video")])
+        assert stdb.search_tracks([SOLO]) == {0: (pk, "new-video")}
+        assert stdb.get_unvalidated() == [(pk, "new-video")]
+
+    def test_get_unvalidated_should_skip_recently_validated(self, stdb):
+        stdb.add_tracks([(SOLO, "ymjNGjuBCTo"), (OTHER, "JGwWNGJdvx8")])
+        solo_pk = stdb.search_tracks([SOLO])[0][0]
+
+        stdb.mark_validated(alive=[solo_pk], dead=[])
+
+        assert [youtube_id for _, youtube_id in stdb.get_unvalidated()] == [
+            "JGwWNGJdvx8"
+        ]
+
+
+class TestPlaylistSnapshot:
+    def test_load_playlist_should_return_tracks_in_order_with_cached_videos(self, stdb):
+        stdb.add_tracks([(SOLO, "ymjNGjuBCTo")])
+        stdb.save_playlist(
+            "spotify-id",
+            SpotifyPlaylist("Mix", "", items=[DUET, SOLO, OTHER], snapshot_id="v1"),
+        )
+
+        playlist, found = stdb.load_playlist("spotify-id")
+
+        assert playlist.load() == [DUET, SOLO, OTHER]
+        assert playlist.snapshot_id == "v1"
+        assert found == {1: (found[1][0], "ymjNGjuBCTo")}
+
+    def test_save_playlist_should_replace_stored_version(self, stdb):
+        stdb.save_playlist("spotify-id", SpotifyPlaylist("Mix", "", items=[DUET, SOLO]))
+        stdb.save_playlist(
+            "spotify-id", SpotifyPlaylist("Mix", "", items=[OTHER], snapshot_id="v2")
+        )
+
+        playlist, _ = stdb.load_playlist("spotify-id")
+
+        assert playlist.load() == [OTHER]
+        assert playlist.snapshot_id == "v2"
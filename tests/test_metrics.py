@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from src import metrics
+from src.metrics import Metrics
+
+
+@pytest.fixture
+def recorder():
+    recorder = metrics.enable()
+    yield recorder
+    metrics.disable()
+
+
+class TestMetrics:
+    def test_summary_should_report_percentiles_per_stage(self):
+        recorder = Metrics()
+        for value in range(1, 101):
+            recorder.observe("db.lookup", value / 1000)
+        recorder.count("cache.hit", 3)
+
+        summary = recorder.summary(tracks=10, elapsed=2.0)
+
+        assert summary["stages"]["db.lookup"]["p50"] == 0.05
+        assert summary["stages"]["db.lookup"]["p95"] == 0.095
+        assert summary["counters"] == {"cache.hit": 3}
+        assert summary["tracks_per_second"] == 5.0
+
+    def test_should_record_nothing_while_disabled(self):
+        with metrics.timer("db.lookup"):
+            metrics.count("cache.hit")
+
+        assert metrics.get() is None
+
+    def test_write_should_use_prometheus_format_for_prom_files(
+        self, recorder, tmp_path
+    ):
+        with metrics.timer("youtube.insert"):
+            metrics.count("cache.miss")
+        path = tmp_path / "spottube.prom"
+
+        recorder.write(str(path), tracks=1, elapsed=1.0)
+
+        content = path.read_text()
+        assert 'spottube_stage_seconds_count{stage="youtube.insert"} 1' in content
+        assert 'spottube_events_total{name="cache.miss"} 1' in content
+
+    def test_write_should_use_json_for_other_files(self, recorder, tmp_path):
+        metrics.count("cache.hit", 2)
+        path = tmp_path / "spottube.json"
+
+        recorder.write(str(path))
+
+        assert json.loads(path.read_text())["counters"] == {"cache.hit": 2}
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from src.pipeline import ordered_map
+
+
+class TestOrderedMap:
+    def test_should_yield_results_in_input_order(self):
+        def slow_first(n):
+            time.sleep(0.05 if n == 0 else 0)
+            return n * 10
+
+        results = [
+            (item, future.result())
+            for item, future in ordered_map(slow_first, range(5), workers=3, buffer=4)
+        ]
+        assert results == [(0, 0), (1, 10), (2, 20), (3, 30), (4, 40)]
+
+    def test_should_pull_input_lazily(self):
+        pulled = []
+
+        def source():
+            for n in range(100):
+                pulled.append(n)
+                yield n
+
+        iterator = ordered_map(lambda n: n, source(), workers=2, buffer=3)
+        next(iterator)
+        assert len(pulled) == 4
+
+    def test_should_not_run_more_than_workers_at_once(self):
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def work(n):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            return n
+
+        for _, future in ordered_map(work, range(10), workers=2, buffer=6):
+            future.result()
+        assert peak <= 2
@@ -0,0 +1,54 @@
+import pytest
+
+from src.database.connection import Database, STdb
+from src.youtube.api import QuotaTracker
+
+
+@pytest.fixture
+def stdb():
+    return STdb(Database("sqlite://"))
+
+
+class TestQuotaTracker:
+    def test_charge_should_persist_daily_total(self, stdb):
+        QuotaTracker(stdb).charge("playlistItems.insert", 3)
+        QuotaTracker(stdb).charge("playlists.insert")
+
+        tracker = QuotaTracker(stdb, daily_limit=1000)
+        assert tracker.used == 200
+        assert tracker.remaining == 800
+
+    def test_reserve_should_refuse_units_reserved_by_another_run(self, stdb):
+        first = QuotaTracker(stdb, daily_limit=1000)
+        second = QuotaTracker(stdb, daily_limit=1000)
+
+        assert first.reserve(700)
+        assert not second.reserve(700)
+        assert second.reserve(300)
+
+    def test_charge_should_be_taken_from_reservation(self, stdb):
+        tracker = QuotaTracker(stdb, daily_limit=1000)
+        tracker.reserve(200)
+
+        tracker.charge("playlistItems.insert", 3)
+        assert tracker.used == 200
+
+        tracker.release()
+        assert tracker.used == 150
+
+    def test_plan_should_fit_when_budget_is_enough(self):
+        plan = QuotaTracker(daily_limit=10000).plan(100)
+
+        assert plan.cost == 50 + 100 * 50
+        assert plan.fits
+        assert plan.tracks_today == 100
+
+    def test_plan_should_count_tracks_that_fit_today(self):
+        tracker = QuotaTracker(daily_limit=1000)
+        tracker.charge("videos.list", 100)
+
+        plan = tracker.plan(100)
+
+        assert not plan.fits
+        assert plan.remaining == 900
+        assert plan.tracks_today == (900 - 50) // 50
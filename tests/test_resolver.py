@@ -0,0 +1,156 @@
+import socket
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from selenium.common.exceptions import NoSuchDriverException
+
+from src.spotify.models import Artist, Track
+from src.youtube.api import QuotaTracker
+from src.youtube.exception import ResolverError, VideoNotFoundException
+from src.youtube.resolver import (
+    AdaptiveResolver,
+    ApiResolver,
+    HttpResolver,
+    Resolver,
+    SeleniumResolver,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+SAMPLE_TRACK = Track("Never Gonna Give You Up", [Artist("Rick Astley")])
+
+
+def load_fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def mock_session(html: str) -> MagicMock:
+    session = MagicMock()
+    session.get.return_value.text = html
+    return session
+
+
+class TestHttpResolver:
+    def test_extract_ids_should_return_video_ids_in_page_order(self):
+        ids = HttpResolver.extract_ids(load_fixture("youtube_results.html"))
+        assert ids == ["dQw4w9WgXcQ", "yPYZpwSpKmA", "lYBUbBu4W08"]
+
+    def test_resolve_should_return_first_video_id(self):
+        session = mock_session(load_fixture("youtube_results.html"))
+        resolver = HttpResolver(session=session)
+
+        assert resolver.resolve(SAMPLE_TRACK) == "dQw4w9WgXcQ"
+        session.get.assert_called_once_with(
+            "https://www.youtube.com/results?search_query=Rick+Astley+Never+Gonna+Give+You+Up",
+            timeout=10,
+        )
+
+    def test_resolve_should_raise_video_not_found_when_there_are_no_videos(self):
+        resolver = HttpResolver(
+            session=mock_session(load_fixture("youtube_no_results.html"))
+        )
+        with pytest.raises(VideoNotFoundException):
+            resolver.resolve(SAMPLE_TRACK)
+
+    def test_resolve_should_raise_resolver_error_when_page_has_no_initial_data(self):
+        resolver = HttpResolver(
+            session=mock_session(load_fixture("youtube_consent.html"))
+        )
+        with pytest.raises(ResolverError):
+            resolver.resolve(SAMPLE_TRACK)
+
+    def test_resolve_should_raise_resolver_error_when_layout_is_unknown(self):
+        html = (
+            '<script>var ytInitialData = {"contents": {"itemSectionRenderer": '
+            '{"contents": [{"videoViewModel": {"id": "dQw4w9WgXcQ"}}]}}};</script>'
+        )
+        resolver = HttpResolver(session=mock_session(html))
+
+        with pytest.raises(ResolverError):
+            resolver.resolve(SAMPLE_TRACK)
+
+    def test_resolve_should_raise_resolver_error_on_http_error(self):
+        session = MagicMock()
+        session.get.side_effect = requests.ConnectionError("connection reset")
+        resolver = HttpResolver(session=session)
+        with pytest.raises(ResolverError):
+            resolver.resolve(SAMPLE_TRACK)
+
+
+class StubResolver(Resolver):
+    def __init__(self, name, outcome, latency=1.0, operation=None):
+        self.name = name
+        self.outcome = outcome
+        self.expected_latency = latency
+        self.operation = operation
+        self.calls = 0
+
+    def resolve(self, track):
+        self.calls += 1
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+class TestAdaptiveResolver:
+    def test_should_prefer_faster_backend_and_fall_back_on_error(self):
+        slow = StubResolver("slow", "slow-id", latency=5.0)
+        fast = StubResolver("fast", ResolverError("blocked"), latency=1.0)
+        resolver = AdaptiveResolver([slow, fast])
+
+        assert resolver.resolve(SAMPLE_TRACK) == "slow-id"
+        assert (fast.calls, slow.calls) == (1, 1)
+        assert resolver.counters()["fast"]["errors"] == 1
+
+    def test_should_fall_back_when_parsing_fails(self):
+        primary = HttpResolver(
+            session=mock_session(load_fixture("youtube_consent.html"))
+        )
+        fallback = StubResolver("selenium", "dQw4w9WgXcQ", latency=6.0)
+        resolver = AdaptiveResolver([primary, fallback])
+
+        assert resolver.resolve(SAMPLE_TRACK) == "dQw4w9WgXcQ"
+        assert fallback.calls == 1
+
+    def test_should_not_fall_back_when_video_does_not_exist(self):
+        primary = HttpResolver(
+            session=mock_session(load_fixture("youtube_no_results.html"))
+        )
+        fallback = StubResolver("selenium", "dQw4w9WgXcQ", latency=6.0)
+        resolver = AdaptiveResolver([primary, fallback])
+
+        with pytest.raises(VideoNotFoundException):
+            resolver.resolve(SAMPLE_TRACK)
+        assert fallback.calls == 0
+
+    @patch("src.youtube.search.YTSearch.search_id")
+    def test_should_fall_back_when_browser_fails(self, search_id):
+        search_id.side_effect = NoSuchDriverException("chromedriver not found")
+        selenium = SeleniumResolver(MagicMock(lean=True))
+        http = StubResolver("http", ResolverError("blocked"))
+        api = StubResolver("api", "api-id", latency=10.0, operation="search.list")
+        resolver = AdaptiveResolver(
+            [http, selenium, api], quota=QuotaTracker(), budget=100
+        )
+
+        assert resolver.resolve(SAMPLE_TRACK) == "api-id"
+        assert resolver.counters()["selenium"]["errors"] == 1
+
+    def test_should_fall_back_when_api_connection_fails(self):
+        api = ApiResolver(MagicMock(side_effect=socket.timeout("timed out")))
+        http = StubResolver("http", "http-id", latency=2.0)
+        resolver = AdaptiveResolver([api, http], quota=QuotaTracker(), budget=100)
+
+        assert resolver.resolve(SAMPLE_TRACK) == "http-id"
+        assert resolver.counters()["api"]["errors"] == 1
+
+    def test_should_use_api_only_within_budget(self):
+        quota = QuotaTracker()
+        api = StubResolver("api", "api-id", latency=0.1, operation="search.list")
+        scraper = StubResolver("http", "http-id")
+        resolver = AdaptiveResolver([scraper, api], quota=quota, budget=100)
+
+        assert resolver.resolve(SAMPLE_TRACK) == "api-id"
+        assert resolver.resolve(SAMPLE_TRACK) == "http-id"
+        assert resolver.spent == 100
@@ -2,10 +2,11 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
 
 from src.spotify.models import Artist, Track
 from src.youtube.exception import VideoNotFoundException
-from src.youtube.search import UrlBuilder, WebdriverFactory, YTSearch
+from src.youtube.search import UrlBuilder, WebdriverFactory, WebdriverPool, YTSearch
 
 SAMPLE_TRACK = Track("Never Gonna Give You Up", [Artist("Rick Astley")])
 
@@ -20,6 +21,60 @@ class TestWebdriverFactory:
             WebdriverFactory.create_webdriver("UNSUPPORTED")
 
 
+class TestWebdriverPool:
+    @patch("src.youtube.search.WebdriverFactory")
+    def test_lease_should_reuse_warm_driver(self, mock_factory):
+        pool = WebdriverPool(size=2)
+        with pool.lease() as first:
+            pass
+        with pool.lease() as second:
+            pass
+
+        assert first is second
+        assert mock_factory.create_webdriver.call_count == 1
+        assert pool.stats["leases"] == 2
+        assert pool.stats["waits"] == 0
+
+    @patch("src.youtube.search.WebdriverFactory")
+    def test_driver_should_be_recycled_after_max_uses(self, mock_factory):
+        mock_factory.create_webdriver.side_effect = lambda name, lean=False: MagicMock()
+        pool = WebdriverPool(size=1, max_uses=2)
+        drivers = []
+        for _ in range(3):
+            with pool.lease() as driver:
+                drivers.append(driver)
+
+        assert drivers[0] is drivers[1]
+        assert drivers[2] is not drivers[0]
+        drivers[0].quit.assert_called_once()
+        assert pool.stats["recycled"] == 1
+
+    @patch("src.youtube.search.WebdriverFactory")
+    def test_crashed_driver_should_be_replaced(self, mock_factory):
+        mock_factory.create_webdriver.side_effect = lambda name, lean=False: MagicMock()
+        pool = WebdriverPool(size=1)
+        with pytest.raises(WebDriverException):
+            with pool.lease() as crashed:
+                raise WebDriverException("chrome not reachable")
+        with pool.lease() as driver:
+            pass
+
+        assert driver is not crashed
+        crashed.quit.assert_called_once()
+
+    @patch("src.youtube.search.WebdriverFactory")
+    def test_close_should_quit_idle_drivers(self, mock_factory):
+        pool = WebdriverPool(size=1)
+        with pool.lease() as driver:
+            pass
+        pool.close()
+
+        driver.quit.assert_called_once()
+        with pytest.raises(RuntimeError):
+            with pool.lease():
+                pass
+
+
 class TestSearchUrlBuilder:
     def test_builder_should_create_url(self):
         expected_url = "https://www.youtube.com/results?search_query=Rick+Astley+Never+Gonna+Give+You+Up"
@@ -80,3 +135,33 @@ class TestYTSearch:
             searcher.search_id(SAMPLE_TRACK)
 
         assert str(e.value) == "No suitable video found."
+
+
+class TestLeanSearch:
+    @pytest.mark.parametrize(
+        "href",
+        [
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&pp=ygUXcmljaw%3D%3D",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s",
+        ],
+    )
+    @patch("src.youtube.search.WebdriverFactory")
+    def test_find_id_by_href_should_accept_url_with_or_without_suffix(
+        self, mock_factory, href
+    ):
+        assert YTSearch().find_id_by_href(href) == "dQw4w9WgXcQ"
+
+    @patch("src.youtube.search.WebdriverFactory")
+    def test_should_read_all_links_in_one_script(self, mock_factory):
+        driver = mock_factory.create_webdriver.return_value.driver
+        driver.execute_script.return_value = [
+            "https://www.youtube.com/shorts/abcdefghijk",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        ]
+        searcher = YTSearch(lean=True)
+
+        assert searcher.search_id(SAMPLE_TRACK) == "dQw4w9WgXcQ"
+        driver.execute_script.assert_called_once_with(YTSearch.HREFS_SCRIPT)
+        driver.find_elements.assert_not_called()
+        mock_factory.create_webdriver.assert_called_once_with("Chrome", lean=True)
@@ -0,0 +1,249 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from src import metrics
+from src.database.connection import Database, STdb
+from src.spot_tube import SpotTube
+from src.spotify.api import SpotifyApiError
+from src.spotify.models import Artist, Playlist, Track
+from src.youtube.api import QuotaTracker
+from src.youtube.exception import ResolverError, VideoNotFoundException
+
+TRACKS = [Track(f"Song {n}", [Artist("Artist")]) for n in range(5)]
+
+
+def quota_error() -> HttpError:
+    return HttpError(MagicMock(status=403, reason="quotaExceeded"), b"{}")
+
+
+@pytest.fixture
+def app():
+    with patch("src.spot_tube.Spotify"), patch("src.spot_tube.Youtube"):
+        app = SpotTube("id", "secret", "credentials.json", STdb(Database("sqlite://")))
+    app.spotify.capture_playlist.side_effect = lambda _: Playlist(
+        "Mix", "", items=list(TRACKS), snapshot_id="v1"
+    )
+    app.spotify.get_snapshot_id.return_value = "v1"
+    app.youtube.create_playlist.return_value = "yt-playlist"
+    app.youtube.search_video_by_web_scraping.side_effect = lambda track: track.title
+    app.youtube.add_track_to_playlist.return_value = True
+    return app
+
+
+def inserted_videos(app):
+    return [call.args[1] for call in app.youtube.add_track_to_playlist.call_args_list]
+
+
+class TestTransfer:
+    def test_should_insert_tracks_in_playlist_order(self, app):
+        assert app.do_transfer("spotify-playlist")
+
+        assert inserted_videos(app) == [track.title for track in TRACKS]
+
+    def test_should_resume_stopped_transfer_in_same_playlist(self, app):
+        app.youtube.add_track_to_playlist.side_effect = [True, True, quota_error()]
+        assert not app.do_transfer("spotify-playlist")
+
+        app.youtube.add_track_to_playlist.reset_mock()
+        app.youtube.add_track_to_playlist.side_effect = None
+        assert app.do_transfer("spotify-playlist")
+
+        app.youtube.create_playlist.assert_called_once()
+        assert inserted_videos(app) == ["Song 2", "Song 3", "Song 4"]
+        assert app.db.get_open_job("spotify-playlist") is None
+
+    def test_should_plan_with_quota_left_by_parallel_run(self, app):
+        app.quota_policy = "split"
+        # a parallel run reserved all but the units for the playlist and two tracks
+        other = QuotaTracker(app.db, daily_limit=app.quota.daily_limit)
+        assert other.reserve(app.quota.daily_limit - 150)
+
+        assert app.do_transfer("spotify-playlist")
+
+        assert inserted_videos(app) == ["Song 0", "Song 1"]
+        # the mocked YouTube charged nothing, the reservation is given back
+        assert app.quota.used == app.quota.daily_limit - 150
+
+    def test_should_create_new_playlist_after_finished_transfer(self, app):
+        app.do_transfer("spotify-playlist")
+        app.do_transfer("spotify-playlist")
+
+        assert app.youtube.create_playlist.call_count == 2
+
+
+class TestUpdate:
+    def test_should_skip_unchanged_playlist(self, app):
+        app.do_transfer("spotify-playlist")
+        app.youtube.reset_mock()
+
+        assert app.do_update("spotify-playlist")
+
+        app.youtube.get_playlist_video_ids.assert_not_called()
+        app.youtube.add_track_to_playlist.assert_not_called()
+
+    def test_should_insert_only_added_tracks(self, app):
+        app.do_transfer("spotify-playlist")
+        app.youtube.reset_mock()
+        app.youtube.get_playlist_video_ids.return_value = [t.title for t in TRACKS]
+        app.youtube.add_track_to_playlist.return_value = True
+        app.youtube.search_video_by_web_scraping.side_effect = lambda t: t.title
+        new_track = Track("New Song", [Artist("Artist")])
+        app.spotify.get_snapshot_id.return_value = "v2"
+        app.spotify.capture_playlist.side_effect = lambda _: Playlist(
+            "Mix", "", items=[*TRACKS[:2], new_track, *TRACKS[2:]], snapshot_id="v2"
+        )
+
+        assert app.do_update("spotify-playlist")
+
+        assert inserted_videos(app) == ["New Song"]
+        assert app.db.get_last_job("spotify-playlist")[2] == "v2"
+
+    def test_should_not_read_youtube_playlist_without_quota(self, app):
+        app.do_transfer("spotify-playlist")
+        app.youtube.reset_mock()
+        app.spotify.get_snapshot_id.return_value = "v2"
+        app.quota.charge("videos.list", app.quota.remaining)
+
+        assert not app.do_update("spotify-playlist")
+
+        app.youtube.get_playlist_video_ids.assert_not_called()
+
+    def test_should_report_playlist_that_cannot_be_read(self, app):
+        app.do_transfer("spotify-playlist")
+        app.spotify.get_snapshot_id.return_value = "v2"
+        app.spotify.capture_playlist.side_effect = SpotifyApiError("unavailable")
+
+        assert not app.do_update("spotify-playlist")
+
+    def test_should_refuse_playlist_that_was_never_transferred(self, app):
+        assert not app.do_update("spotify-playlist")
+
+
+class TestMissingTracks:
+    def test_should_skip_track_that_was_not_found(self, app):
+        def search(track):
+            if track.title == "Song 1":
+                raise VideoNotFoundException("no results")
+            return track.title
+
+        app.youtube.search_video_by_web_scraping.side_effect = search
+
+        assert app.do_transfer("spotify-playlist")
+
+        assert "Song 1" not in inserted_videos(app)
+        assert app.report.skipped == ["Song 1 by Artist: no results"]
+
+    def test_should_not_search_cached_miss_again(self, app):
+        app.db.add_missing([(TRACKS[1], "no results")])
+
+        app.do_transfer("spotify-playlist")
+
+        searched = [
+            call.args[0].title
+            for call in app.youtube.search_video_by_web_scraping.call_args_list
+        ]
+        assert "Song 1" not in searched
+        assert app.report.skipped == ["Song 1 by Artist: no results (cached)"]
+
+
+class TestValidateCache:
+    def test_should_resolve_dead_videos_again(self, app):
+        app.do_transfer("spotify-playlist")
+        app.youtube.check_videos.side_effect = lambda ids, region: {
+            video: video != "Song 2" for video in ids
+        }
+
+        summary = app.validate_cache()
+
+        assert summary == {"checked": 5, "dead": 1, "left": 0}
+        app.youtube.reset_mock()
+        app.youtube.search_video_by_web_scraping.side_effect = lambda t: t.title
+        app.do_transfer("spotify-playlist")
+        searched = [
+            call.args[0].title
+            for call in app.youtube.search_video_by_web_scraping.call_args_list
+        ]
+        assert searched == ["Song 2"]
+
+
+class TestMetrics:
+    def test_should_write_stage_timings_after_transfer(self, app, tmp_path):
+        app.metrics_file = str(tmp_path / "metrics.json")
+        metrics.enable()
+        try:
+            app.do_transfer("spotify-playlist")
+        finally:
+            metrics.disable()
+
+        summary = json.loads((tmp_path / "metrics.json").read_text())
+        assert summary["tracks"] == 5
+        assert summary["counters"]["cache.miss"] == 5
+        assert {"spotify.capture", "db.lookup", "db.write"} <= set(summary["stages"])
+
+
+class TestLoad:
+    def test_should_transfer_stored_playlist_without_fetching_it(self, app):
+        app.do_transfer("spotify-playlist")
+        app.spotify.capture_playlist.reset_mock()
+        app.youtube.reset_mock()
+        app.youtube.create_playlist.return_value = "yt-playlist-2"
+        app.youtube.add_track_to_playlist.return_value = True
+
+        assert app.do_load("spotify-playlist")
+
+        app.spotify.capture_playlist.assert_not_called()
+        app.youtube.search_video_by_web_scraping.assert_not_called()
+        assert inserted_videos(app) == [track.title for track in TRACKS]
+
+    def test_should_fetch_playlist_that_changed_on_spotify(self, app):
+        app.do_transfer("spotify-playlist")
+        app.spotify.capture_playlist.reset_mock()
+        app.spotify.get_snapshot_id.return_value = "v2"
+
+        assert app.do_load("spotify-playlist")
+
+        app.spotify.capture_playlist.assert_called_once()
+
+    def test_should_use_cache_for_track_stored_without_video(self, app):
+        def search(track):
+            if track.title == "Song 1":
+                raise ResolverError("blocked")
+            return track.title
+
+        app.youtube.search_video_by_web_scraping.side_effect = search
+        app.do_transfer("spotify-playlist")
+        # cached later under another spelling
+        app.db.add_tracks(
+            [(Track("Song 1 - Remastered 2017", [Artist("Artist")]), "cached-id")]
+        )
+        app.db.flush()
+        app.youtube.reset_mock()
+        app.youtube.create_playlist.return_value = "yt-playlist-2"
+        app.youtube.add_track_to_playlist.return_value = True
+
+        assert app.do_load("spotify-playlist")
+
+        app.youtube.search_video_by_web_scraping.assert_not_called()
+        assert inserted_videos(app)[1] == "cached-id"
+
+    def test_should_refuse_playlist_that_is_not_stored(self, app):
+        assert not app.do_load("spotify-playlist")
+
+    def test_should_not_store_playlist_whose_fetch_failed(self, app):
+        def stream():
+            yield TRACKS[2]
+            raise SpotifyApiError("Spotify answered 503 after 6 attempts.")
+
+        app.spotify.capture_playlist.side_effect = lambda _: Playlist(
+            "Mix",
+            "",
+            items=list(TRACKS[:2]),
+            snapshot_id="v1",
+            total=5,
+            stream=stream(),
+        )
+        assert not app.do_transfer("spotify-playlist")
+        assert not app.do_load("spotify-playlist")
@@ -0,0 +1,209 @@
+from http import HTTPStatus
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from src.spotify.api import Spotify, SpotifyApiError, SpotifyException
+from src.spotify.token import TokenManager
+
+
+def page(names, next_url=None, total=None):
+    result = {
+        "items": [
+            {
+                "track": {
+                    "id": f"id-{name}",
+                    "name": name,
+                    "duration_ms": 1000,
+                    "artists": [{"name": "Artist"}],
+                }
+            }
+            for name in names
+        ],
+        "next": next_url,
+    }
+    if total is not None:
+        result["total"] = total
+    return result
+
+
+@pytest.fixture
+def spotify():
+    client = Spotify("client_id", "client_secret")
+    client.token_manager = MagicMock()
+    client.token_manager.get.return_value = "token"
+    client.session = MagicMock()
+    return client
+
+
+def token_response(token, expires_in=3600):
+    response = MagicMock(status_code=HTTPStatus.OK)
+    response.json.return_value = {"access_token": token, "expires_in": expires_in}
+    return response
+
+
+def respond(spotify, *payloads):
+    spotify.session.get.return_value.json.side_effect = list(payloads)
+
+
+class TestCapturePlaylist:
+    def test_should_follow_next_pages_lazily(self, spotify):
+        respond(
+            spotify,
+            {
+                "name": "Mix",
+                "description": "",
+                "snapshot_id": "snap",
+                "tracks": page(["a", "b"], next_url="next", total=3),
+            },
+            page(["c"]),
+        )
+
+        playlist = spotify.capture_playlist("playlist")
+
+        assert playlist.songs == 3
+        assert spotify.session.get.call_count == 1
+        assert [track.title for track in playlist] == ["a", "b", "c"]
+        assert spotify.session.get.call_count == 2
+        _, kwargs = spotify.session.get.call_args
+        assert kwargs["params"]["offset"] == 2
+        assert playlist.items[0].spotify_id == "id-a"
+
+    def test_should_skip_removed_tracks(self, spotify):
+        first_page = page(["a"], total=2)
+        first_page["items"].append({"track": None})
+        respond(
+            spotify,
+            {"name": "Mix", "snapshot_id": "snap", "tracks": first_page},
+        )
+
+        assert [track.title for track in spotify.capture_playlist("playlist")] == ["a"]
+
+    def test_should_raise_spotify_exception_for_invalid_id(self, spotify):
+        spotify.session.get.return_value.status_code = HTTPStatus.NOT_FOUND
+        respond(spotify, {"error": {"status": 404, "message": "Not found."}})
+
+        with pytest.raises(SpotifyException):
+            spotify.capture_playlist("invalid")
+
+    def test_should_fetch_remaining_pages_concurrently_in_order(self, spotify):
+        spotify.PAGE_SIZE = 2
+        first = {
+            "name": "Mix",
+            "snapshot_id": "snap",
+            "tracks": page(["t0", "t1"], next_url="next", total=7),
+        }
+
+        def get(url, headers, params, timeout):
+            response = MagicMock()
+            if "offset" not in params:
+                response.json.return_value = first
+            else:
+                offset = params["offset"]
+                names = [f"t{n}" for n in range(offset, min(offset + 2, 7))]
+                response.json.return_value = page(names, next_url="next")
+            return response
+
+        spotify.session.get.side_effect = get
+
+        titles = [track.title for track in spotify.capture_playlist("playlist")]
+
+        assert titles == [f"t{n}" for n in range(7)]
+        offsets = sorted(
+            call.kwargs["params"]["offset"]
+            for call in spotify.session.get.call_args_list[1:]
+        )
+        assert offsets == [2, 4, 6]
+
+
+class TestTokenManager:
+    @patch("src.spotify.token.requests.post")
+    def test_should_reuse_token_cached_on_disk(self, mock_post, tmp_path):
+        cache_file = str(tmp_path / "token.json")
+        mock_post.return_value = token_response("first")
+
+        assert TokenManager("id", "secret", cache_file).get() == "first"
+        assert TokenManager("id", "secret", cache_file).get() == "first"
+        assert mock_post.call_count == 1
+
+    @patch("src.spotify.token.requests.post")
+    def test_should_not_reuse_token_of_another_client(self, mock_post, tmp_path):
+        cache_file = str(tmp_path / "token.json")
+        mock_post.side_effect = [token_response("first"), token_response("second")]
+
+        TokenManager("id", "secret", cache_file).get()
+
+        assert TokenManager("other", "secret", cache_file).get() == "second"
+
+    @patch("src.spotify.token.requests.post")
+    def test_invalidated_token_should_not_be_read_back_from_disk(
+        self, mock_post, tmp_path
+    ):
+        cache_file = str(tmp_path / "token.json")
+        mock_post.side_effect = [token_response("revoked"), token_response("fresh")]
+        manager = TokenManager("id", "secret", cache_file)
+
+        assert manager.get() == "revoked"
+        manager.invalidate("revoked")
+
+        assert manager.get() == "fresh"
+        assert mock_post.call_count == 2
+        assert TokenManager("id", "secret", cache_file).get() == "fresh"
+
+    @patch("src.spotify.token.requests.post")
+    def test_should_refresh_token_ahead_of_expiry(self, mock_post):
+        mock_post.side_effect = [
+            token_response("first", expires_in=30),
+            token_response("second"),
+        ]
+        manager = TokenManager("id", "secret", leeway=60)
+
+        assert manager.get() == "first"
+        assert manager.get() == "second"
+
+
+class TestUnauthorizedRetry:
+    def test_should_refresh_token_once_on_401(self, spotify):
+        unauthorized = MagicMock(status_code=HTTPStatus.UNAUTHORIZED)
+        ok = MagicMock(status_code=HTTPStatus.OK)
+        ok.json.return_value = {"name": "Mix", "tracks": page([], total=0)}
+        spotify.session.get.side_effect = [unauthorized, ok]
+        spotify.token_manager.get.side_effect = ["expired", "fresh"]
+
+        playlist = spotify.capture_playlist("playlist")
+
+        assert playlist.name == "Mix"
+        spotify.token_manager.invalidate.assert_called_once_with("expired")
+        _, kwargs = spotify.session.get.call_args
+        assert kwargs["headers"]["Authorization"] == "Bearer fresh"
+
+
+@patch("src.spotify.api.time.sleep")
+class TestTransientErrors:
+    def test_should_wait_retry_after_on_rate_limit(self, sleep, spotify):
+        limited = MagicMock(status_code=HTTPStatus.TOO_MANY_REQUESTS)
+        limited.headers = {"Retry-After": "3"}
+        ok = MagicMock(status_code=HTTPStatus.OK)
+        ok.json.return_value = {"snapshot_id": "snap"}
+        spotify.session.get.side_effect = [limited, ok]
+
+        assert spotify.get_snapshot_id("playlist") == "snap"
+        sleep.assert_called_once_with(3.0)
+
+    def test_should_retry_network_errors(self, sleep, spotify):
+        ok = MagicMock(status_code=HTTPStatus.OK)
+        ok.json.return_value = {"snapshot_id": "snap"}
+        spotify.session.get.side_effect = [requests.ConnectionError("reset"), ok]
+
+        assert spotify.get_snapshot_id("playlist") == "snap"
+        assert sleep.call_count == 1
+
+    def test_should_raise_api_error_when_retries_run_out(self, sleep, spotify):
+        unavailable = MagicMock(status_code=HTTPStatus.SERVICE_UNAVAILABLE)
+        unavailable.headers = {}
+        spotify.session.get.return_value = unavailable
+
+        with pytest.raises(SpotifyApiError):
+            spotify.get_snapshot_id("playlist")
+        assert spotify.session.get.call_count == Spotify.MAX_RETRIES + 1
@@ -0,0 +1,142 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.youtube.api import PlayListItems, Search, Videos, Youtube
+
+
+def http_error(status: int) -> HttpError:
+    return HttpError(MagicMock(status=status, reason="error"), b"{}")
+
+
+@pytest.fixture
+def items():
+    operation = PlayListItems(MagicMock())
+    with patch("src.youtube.api.time.sleep"):
+        yield operation
+
+
+class TestPlayListItemsInsert:
+    def test_should_append_when_position_is_not_given(self, items):
+        items.insert("playlist", "dQw4w9WgXcQ")
+
+        _, kwargs = items.youtube.playlistItems().insert.call_args
+        assert "position" not in kwargs["body"]["snippet"]
+
+    def test_should_set_explicit_position(self, items):
+        items.insert("playlist", "dQw4w9WgXcQ", position=3)
+
+        _, kwargs = items.youtube.playlistItems().insert.call_args
+        assert kwargs["body"]["snippet"]["position"] == 3
+
+    def test_should_retry_transient_errors(self, items):
+        request = items.youtube.playlistItems().insert.return_value
+        request.execute.side_effect = [http_error(500), http_error(409), {"id": "item"}]
+
+        assert items.insert("playlist", "dQw4w9WgXcQ") == {"id": "item"}
+        assert request.execute.call_count == 3
+
+    def test_should_not_retry_permanent_errors(self, items):
+        request = items.youtube.playlistItems().insert.return_value
+        request.execute.side_effect = http_error(404)
+
+        with pytest.raises(HttpError):
+            items.insert("playlist", "dQw4w9WgXcQ")
+        assert request.execute.call_count == 1
+
+    def test_should_give_up_after_max_retries(self, items):
+        request = items.youtube.playlistItems().insert.return_value
+        request.execute.side_effect = http_error(503)
+
+        with pytest.raises(HttpError):
+            items.insert("playlist", "dQw4w9WgXcQ")
+        assert request.execute.call_count == items.MAX_RETRIES + 1
+
+
+class TestExecuteBatch:
+    def test_should_retry_only_transiently_failed_requests(self, items):
+        outcomes = {
+            "0": [({"id": "a"}, None)],
+            "1": [(None, http_error(503)), ({"id": "b"}, None)],
+            "2": [(None, http_error(404))],
+        }
+        batches = []
+
+        def new_batch(callback):
+            batch = MagicMock()
+            added = []
+            batch.add.side_effect = lambda request, request_id: added.append(request_id)
+
+            def execute():
+                batches.append(list(added))
+                for request_id in added:
+                    callback(request_id, *outcomes[request_id].pop(0))
+
+            batch.execute.side_effect = execute
+            return batch
+
+        items.youtube.new_batch_http_request.side_effect = new_batch
+
+        responses = items.execute_batch(["r0", "r1", "r2"], "videos.list")
+
+        assert responses == [{"id": "a"}, {"id": "b"}, None]
+        assert batches == [["0", "1", "2"], ["1"]]
+
+
+class TestVideosCheck:
+    def test_should_mark_missing_and_private_videos_dead(self):
+        videos = Videos(MagicMock())
+        response = {
+            "items": [
+                {"id": "alive", "status": {"uploadStatus": "processed"}},
+                {"id": "hidden", "status": {"privacyStatus": "private"}},
+            ]
+        }
+
+        def new_batch(callback):
+            batch = MagicMock()
+            batch.execute.side_effect = lambda: callback("0", response, None)
+            return batch
+
+        videos.youtube.new_batch_http_request.side_effect = new_batch
+
+        result = videos.check(["alive", "hidden", "deleted"])
+
+        assert result == {"alive": True, "hidden": False, "deleted": False}
+        videos.youtube.videos().list.assert_called_once_with(
+            part="status,contentDetails", id="alive,hidden,deleted", maxResults=50
+        )
+
+    def test_should_respect_region_restriction(self):
+        item = {"contentDetails": {"regionRestriction": {"blocked": ["DE"]}}}
+
+        assert Videos.is_playable(item, "US")
+        assert not Videos.is_playable(item, "DE")
+
+
+class TestSearch:
+    def test_should_return_first_video_id(self):
+        search = Search(MagicMock())
+        search.youtube.search().list().execute.return_value = {
+            "items": [{"id": {"kind": "youtube#video", "videoId": "dQw4w9WgXcQ"}}]
+        }
+
+        assert search.video_id("Rick Astley Never Gonna Give You Up") == "dQw4w9WgXcQ"
+
+    def test_should_return_none_without_results(self):
+        search = Search(MagicMock())
+        search.youtube.search().list().execute.return_value = {"items": []}
+
+        assert search.video_id("nothing") is None
+
+
+class TestLazyYoutube:
+    def test_should_not_build_client_until_used(self):
+        with patch.object(Youtube, "_build_google_api_client") as build:
+            youtube = Youtube("secret.json")
+            build.assert_not_called()
+
+            youtube.playlist_items
+            youtube.playlist
+            build.assert_called_once()